@@ -4,21 +4,25 @@
 This module provides functionality that builds dbd `BuildConfiguration`s.
 """
 
-from typing import List, Optional
+from concurrent.futures import as_completed, ThreadPoolExecutor
+from typing import List, Optional, Tuple
 
 from pathlib import Path
 
 import logging
 import subprocess
+import sys
 
 def build_configs_with_dbd(configurations_dir: Path,
                            configuration_files: Optional[List[str]],
                            output_dir: Path,
                            dbd_path: Path,
                            cache: Path,
-                           cache_size: str) -> None:
+                           cache_size: str,
+                           max_workers: int = 1) -> None:
     """
     Builds the dbd `BuildConfiguration`s found in the `configurations` directory.
+    Each configuration is built in its own dbd process; at most `max_workers` of them run at the same time.
 
     Args:
         configurations_dir: The path to the directory in which `BuildConfiguration` files are located.
@@ -29,24 +33,51 @@ def build_configs_with_dbd(configurations_dir: Path,
         dbd_path: The path to the dbd.py file that will be called to build the `BuildConfiguration`s.
         cache: The path to the directory that will be used as the dbd cache.
             This directory does not have to already exist.
+        cache_size: The maximal number of (regular) files that are allowed to be kept in the cache.
+        max_workers: The maximal number of dbd processes that are run at the same time. The processes share
+            the cache, so more than one should only be used if dbd can use the cache concurrently.
+            Defaults to 1, building the configurations one after the other.
+
+    Raises:
+        subprocess.CalledProcessError: If building any of the configurations failed. The configurations whose
+            build has not started yet are not built, the ones already being built are waited for.
+
     """
 
     logging.info("Building the configurations with dbd.")
-    files_in_configurations_dir = configurations_dir.expanduser().resolve().iterdir()
-    filter_function = lambda file_path: _filter_paths(file_path, configuration_files)
-    build_config_files = filter(filter_function, files_in_configurations_dir)
+    files_in_configurations_dir = configurations_dir.iterdir()
+    configuration_file_names = frozenset(configuration_files) if configuration_files is not None else None
+    build_config_files = (file_path for file_path in files_in_configurations_dir
+                          if not file_path.is_dir()
+                          and (configuration_file_names is None or file_path.name in configuration_file_names))
 
-    for configuration in build_config_files:
-        logging.info("Building configuration with filename %s.", str(configuration))
-        command = ["python3", str(dbd_path), str(configuration), str(output_dir),
-                   "-c", str(cache), "--cache_size", cache_size]
-        subprocess.run(command, check=True)
+    # Only the configuration file differs between the dbd commands, the rest is built only once.
+    # We run dbd with the interpreter that runs this script so that no `python3` lookup in PATH is needed
+    # and dbd sees the same installed packages.
+    command_prefix = (sys.executable, str(dbd_path))
+    command_suffix = (str(output_dir), "-c", str(cache), "--cache_size", cache_size)
 
-def _filter_paths(file_path: Path, configuration_files: Optional[List[str]]) -> bool:
-    if file_path.is_dir():
-        return False
+    if max_workers == 1:
+        # Without concurrency there is no need for a thread pool, and nothing is started after a failed build.
+        for configuration in build_config_files:
+            _build_config(configuration, command_prefix, command_suffix)
+        return
 
-    if configuration_files is not None:
-        return file_path.name in configuration_files
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_build_config, configuration, command_prefix, command_suffix)
+                   for configuration in build_config_files]
+        for future in as_completed(futures):
+            if future.exception() is not None:
+                # We stop at the first failure: the builds that have not started yet are cancelled.
+                for pending_future in futures:
+                    pending_future.cancel()
+                future.result()
 
-    return True
+def _build_config(configuration: Path, command_prefix: Tuple[str, ...], command_suffix: Tuple[str, ...]) -> None:
+    logging.info("Building configuration with filename %s.", str(configuration))
+    try:
+        subprocess.run((*command_prefix, str(configuration), *command_suffix), check=True)
+    except subprocess.CalledProcessError as error:
+        logging.error("Building configuration with filename %s failed with exit code %s.",
+                      str(configuration), error.returncode)
+        raise
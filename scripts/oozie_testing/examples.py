@@ -10,15 +10,22 @@ from typing import List
 
 import docker
 
-def _command_with_whitelist_and_blacklist(cmd_base: str,
+def _command_with_whitelist_and_blacklist(cmd_base: List[str],
                                           whitelist: List[str],
                                           blacklist: List[str],
-                                          validate: List[str]) -> str:
-    cmd_whitelist = "-w {}".format(" ".join(whitelist)) if whitelist else ""
-    cmd_blacklist = "-b {}".format(" ".join(blacklist)) if blacklist else ""
-    cmd_validate = "-v {}".format(" ".join(validate)) if validate else ""
+                                          validate: List[str]) -> List[str]:
+    cmd = list(cmd_base)
 
-    return " ".join([cmd_base, cmd_whitelist, cmd_blacklist, cmd_validate])
+    if whitelist:
+        cmd += ["-w", *whitelist]
+
+    if blacklist:
+        cmd += ["-b", *blacklist]
+
+    if validate:
+        cmd += ["-v", *validate]
+
+    return cmd
 
 def run_oozie_examples_with_dbd(oozieserver: docker.models.containers.Container,
                                 logfile: str,
@@ -26,7 +33,8 @@ def run_oozie_examples_with_dbd(oozieserver: docker.models.containers.Container,
                                 whitelist: List[str],
                                 blacklist: List[str],
                                 validate: List[str],
-                                timeout: int) -> int:
+                                timeout: int,
+                                parallelism: int = 1) -> int:
     """
     Runs the Oozie examples in the Oozie server docker container.
 
@@ -41,19 +49,27 @@ def run_oozie_examples_with_dbd(oozieserver: docker.models.containers.Container,
         blacklist: A list of examples that should not be run.
         validate: A list of fluent examples that should only be validated, not run.
         timeout: The timeout after which running examples are killed.
+        parallelism: The maximal number of examples that are run at the same time.
 
     Returns:
         The exit code of the process running the test, which is 1 if any tests failed.
 
     """
-    cmd_base = "python3 /opt/oozie/inside_container/example_runner.py --logfile {} --report {}".format(logfile,
-                                                                                                       report_file)
+    # We pass the command as an argument list so that it is not parsed by a shell in the container.
+    cmd_base = ["python3", "/opt/oozie/inside_container/example_runner.py",
+                "--logfile", logfile, "--report", report_file]
 
-    cmd_w_b_list = _command_with_whitelist_and_blacklist(cmd_base, whitelist, blacklist, validate)
-    cmd = cmd_w_b_list + " -t {}".format(timeout)
+    cmd = _command_with_whitelist_and_blacklist(cmd_base, whitelist, blacklist, validate)
+    cmd += ["-t", str(timeout), "-p", str(parallelism)]
 
     logging.info("Running the Oozie examples with command %s.", cmd)
-    (errcode, _) = oozieserver.exec_run(cmd, workdir="/opt/oozie")
+    # The output of the script is not needed as it writes its own logfile, so it is streamed and dropped as it arrives
+    # instead of being collected in memory until the script exits. The exit code is then inspected separately.
+    api = oozieserver.client.api
+    exec_id = api.exec_create(oozieserver.id, cmd, workdir="/opt/oozie")["Id"]
+    for _ in api.exec_start(exec_id, stream=True):
+        pass
+    errcode = api.exec_inspect(exec_id)["ExitCode"]
 
     logging.info("Testing finished with exit code %s.", errcode)
     return errcode
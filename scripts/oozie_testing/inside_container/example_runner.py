@@ -6,43 +6,38 @@ It should be run on the Oozie server, with the Oozie examples uploaded to hdfs.
 
 """
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import as_completed, Future, ThreadPoolExecutor
 
 import argparse
+import functools
 import itertools
 import json
 import logging
+import os
 
 from pathlib import Path
 
-import pickle
-import re
-import socket
 import subprocess
 import sys
 import tempfile
 import time
 import traceback
 
-from typing import Dict, Iterable, List, Optional, Tuple, Union
-
-import urllib.request
-
-# We try to import the modules needed for Kerberos HTTP requests.
-# If successful, we will use them, if not, we do not use kerberos.
-KERBEROS: bool
-try:
-    import requests
-    import requests_kerberos
-    KERBEROS = True
-except ModuleNotFoundError:
-    KERBEROS = False
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, TextIO, Tuple, Union
 
 # pylint: disable=useless-import-alias
 try:
-    # Depending on where this script is run or imported as a module, the `report` module may be in different places.
+    # Depending on where this script is run or imported as a module, the modules next to it may be in different
+    # places.
+    import fluent_build
+    import oozie_cli
+    import oozie_http
     import report
 except ModuleNotFoundError:
-    # We suppress the mypy warning because if execution reaches this point, the name `report` is not defined.
+    # We suppress the mypy warnings because if execution reaches this point, the names are not defined.
+    import oozie_testing.inside_container.fluent_build as fluent_build # type: ignore
+    import oozie_testing.inside_container.oozie_cli as oozie_cli # type: ignore
+    import oozie_testing.inside_container.oozie_http as oozie_http # type: ignore
     import oozie_testing.inside_container.report as report # type: ignore
 
 # pylint: enable=useless-import-alias
@@ -73,7 +68,11 @@ class OozieSubprocessResult:
 
         """
 
-        return OozieSubprocessResult(message, process_result.returncode, process_result.stdout, process_result.stderr)
+        # The output streams that were not captured are `None`.
+        return OozieSubprocessResult(message,
+                                     process_result.returncode,
+                                     process_result.stdout if process_result.stdout is not None else "",
+                                     process_result.stderr if process_result.stderr is not None else "")
 
     def to_string(self) -> str:
         """
@@ -86,78 +85,44 @@ class OozieSubprocessResult:
                                        self.stdout,
                                        self.stderr)
 
-def _get_docker_long_fqdn() -> str:
-    get_ip_command = ["dig", "+short", socket.gethostname()]
-    ip_process_result = subprocess.run(get_ip_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-    ip_addr = ip_process_result.stdout.decode().strip()
-
-    reverse_dns_command = ["dig", "+short", "-x", ip_addr]
-    reverse_dns_process_result = subprocess.run(reverse_dns_command,
-                                                stdout=subprocess.PIPE,
-                                                stderr=subprocess.PIPE, check=True)
-
-    # Delete the last '.' character that dig adds to the reverse DNS result.
-    fqdn = reverse_dns_process_result.stdout.decode().strip()[:-1]
-    return fqdn
-
-def _get_oozie_url() -> str:
-    if KERBEROS:
-        hostname = _get_docker_long_fqdn()
-    else:
-        hostname = "localhost"
-
-    return "http://" + hostname + ":11000/oozie"
-
-def _send_request_kerberos(url: str) -> str:
-    kerberos_auth = requests_kerberos.HTTPKerberosAuth(mutual_authentication=requests_kerberos.OPTIONAL)
-    response = requests.get(url, auth=kerberos_auth)
-    return response.text
-
-def _send_request_unsecure(url: str) -> str:
-    with urllib.request.urlopen(url) as connection:
-        response = connection.read().decode()
-        return response
-
-def _send_request(url: str) -> str:
-    # pylint: disable=no-else-return
-    if KERBEROS:
-        return _send_request_kerberos(url)
-    else:
-        return _send_request_unsecure(url)
-
 def _launch_oozie_job_by_command(command: List[str], example_name: str) -> Union[str, int]:
-    process_result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    result = oozie_cli.run_and_search_output(command, oozie_cli.JOB_ID_RE)
 
-    return_code = process_result.returncode
-    if return_code != 0:
-        return return_code
+    if isinstance(result, str):
+        return result
 
-    output = process_result.stdout.decode()
+    if result.returncode != 0:
+        return result.returncode
 
-    match = re.search("job:(.*)", output)
-    if match is None:
-        raise ValueError("The job id could not be determined for example {}".format(example_name))
+    raise ValueError("The job id could not be determined for example {}".format(example_name))
 
-    job_id = match.group(1).strip()
-
-    return job_id
+# The information about a finished job is fetched with concurrent requests. The threads of this executor
+# are reused, and so are their kept-alive HTTP connections.
+_JOB_INFO_EXECUTOR = ThreadPoolExecutor(max_workers=4)
 
 def _get_oozie_logs(oozie_url: str, job_id: str) -> Tuple[str, str]:
+    url_error_logs_endpoint = "/v2/job/{}?show=errorlog".format(job_id)
+    url_error_logs = oozie_url + url_error_logs_endpoint
+    error_logs_future = _JOB_INFO_EXECUTOR.submit(oozie_http.send_request, url_error_logs)
+
     url_logs_endpoint = "/v1/job/{}?show=log".format(job_id)
     url_logs = oozie_url + url_logs_endpoint
-    logs = _send_request(url_logs)
+    logs = oozie_http.send_request(url_logs)
 
-    url_error_logs_endpoint = "/v2/job/{}?show=errorlog".format(job_id)
-    url_error_logs = oozie_url + url_error_logs_endpoint
-    error_logs = _send_request(url_error_logs)
+    return (logs.decode(), error_logs_future.result().decode())
+
+# The factor by which the interval between two polls of a running job grows.
+POLL_BACKOFF_FACTOR: float = 1.5
 
-    return (logs, error_logs)
+# The maximal interval between two polls of a running job, in seconds.
+MAX_POLL_TIME: float = 10
 
 def _launch_and_wait_for_oozie_job(oozie_url: str,
                                    command: List[str],
                                    example_name: str,
-                                   poll_time: int,
-                                   timeout: int) -> report.ReportRecord:
+                                   poll_time: float,
+                                   timeout: int,
+                                   max_poll_time: float) -> report.ReportRecord:
     logging.info("Running command: %s.", " ".join(command))
 
     launch_result = _launch_oozie_job_by_command(command, example_name)
@@ -168,11 +133,17 @@ def _launch_and_wait_for_oozie_job(oozie_url: str,
 
     logging.info("Oozie job id: %s.", launch_result)
 
-    final_status = wait_for_job_to_finish(oozie_url, launch_result, example_name, poll_time, timeout)
-    applications = get_yarn_applications_of_job(oozie_url, launch_result)
+    final_status = wait_for_job_to_finish(oozie_url, launch_result, example_name, poll_time, timeout, max_poll_time)
+    applications_future = _JOB_INFO_EXECUTOR.submit(get_yarn_applications_of_job, oozie_url, launch_result)
+
+    # The Oozie logs can be large and are rarely needed for succeeded jobs, so they are only fetched for the others.
+    if final_status == report.Result.SUCCEEDED:
+        return report.ReportRecord(example_name, final_status, launch_result, applications_future.result(),
+                                   stdout="Oozie logs are not collected for succeeded jobs.")
+
     (oozie_logs, oozie_error_logs) = _get_oozie_logs(oozie_url, launch_result)
 
-    return report.ReportRecord(example_name, final_status, launch_result, applications,
+    return report.ReportRecord(example_name, final_status, launch_result, applications_future.result(),
                                stdout="Oozie logs:\n\n{}".format(oozie_logs),
                                stderr="Oozie error logs:\n\n{}".format(oozie_error_logs))
 
@@ -197,8 +168,9 @@ class Example(metaclass=ABCMeta):
     @abstractmethod
     def launch(self,
                cli_options: List[str],
-               poll_time: int,
-               timeout: int) -> report.ReportRecord:
+               poll_time: float,
+               timeout: int,
+               max_poll_time: float = MAX_POLL_TIME) -> report.ReportRecord:
         """
         Launches the Oozie example.
 
@@ -206,6 +178,7 @@ class Example(metaclass=ABCMeta):
             cli_options: The CLI options to use when launching the example.
             poll_time: The interval at which the job will be polled, in seconds.
             timeout: The timeout value after which the job is killed, in seconds.
+            max_poll_time: The maximal interval between two polls of the job, in seconds.
 
         Returns:
             A `report.ReportRecord` object storing the result of launching the example.
@@ -240,23 +213,21 @@ class NormalExample(Example):
 
     def launch(self,
                cli_options: List[str],
-               poll_time: int,
-               timeout: int) -> report.ReportRecord:
-        command = ["/opt/oozie/bin/oozie",
-                   "job",
-                   "-oozie",
-                   self._oozie_url,
-                   "-config",
-                   str(self.path / "job.properties"),
-                   "-run"]
-        command.extend(map(lambda option: "-D" + option, cli_options))
-
-        return _launch_and_wait_for_oozie_job(self._oozie_url, command, self.name(), poll_time, timeout)
+               poll_time: float,
+               timeout: int,
+               max_poll_time: float = MAX_POLL_TIME) -> report.ReportRecord:
+        command = oozie_cli.job_command(self._oozie_url, "-config", str(self.path / "job.properties"), "-run")
+        command.extend("-D" + option for option in cli_options)
+
+        return _launch_and_wait_for_oozie_job(self._oozie_url, command, self.name(), poll_time, timeout, max_poll_time)
+
+# The prefix of the names of the fluent job examples.
+FLUENT_EXAMPLE_PREFIX: str = "Fluent_"
 
 # pylint: disable=abstract-method
 class FluentExampleBase(Example, metaclass=ABCMeta):
     """
-    A class representing a fluent job Oozie example.
+    A class representing a fluent job Oozie example. The examples are built with the functions of `fluent_build`.
     """
 
     def __init__(self,
@@ -271,8 +242,12 @@ class FluentExampleBase(Example, metaclass=ABCMeta):
         self._class_name = class_name
         self._oozie_url = oozie_url
 
+        # The directory containing the already compiled class files and the prebuilt jar file, see `build_examples`.
+        self._classes_dir: Optional[Path] = None
+        self._jar_path: Optional[Path] = None
+
     def name(self) -> str:
-        return "Fluent_{}".format(self._class_name)
+        return FLUENT_EXAMPLE_PREFIX + self._class_name
 
     @property
     def class_name(self) -> str:
@@ -286,10 +261,86 @@ class FluentExampleBase(Example, metaclass=ABCMeta):
 
         return self._class_name
 
+    @property
+    def fluent_job_api_jar(self) -> Path:
+        """
+        Returns the path to the Oozie fluent job API jar that the example is compiled against.
+
+        Returns:
+            The path to the Oozie fluent job API jar.
+
+        """
+
+        return self._oozie_fluent_job_api_jar
+
+    @property
+    def path_to_source_file(self) -> Path:
+        """
+        Returns the path to the java source file of the Oozie fluent job example.
+
+        Returns:
+            The path to the java source file of the Oozie fluent job example.
+
+        """
+
+        return self._example_dir / "src" / fluent_build.FLUENT_JOB_PACKAGE_PATH / (self._class_name + ".java")
+
+    @staticmethod
+    def build_examples(examples: List["FluentExampleBase"], build_dir: Path) -> Optional[OozieSubprocessResult]:
+        """
+        Builds all the given fluent examples before they are launched. The java source files are compiled with one
+        `javac` invocation per fluent job API jar, so that a compiler JVM is not started for each example, then the
+        jar files are packaged concurrently, see `fluent_build.package_jars`. `build_example` then returns
+        the prebuilt jar files. If only the packaging of an example fails, `build_example` packages it again when the
+        example is launched, and reports the error.
+
+        Args:
+            examples: The fluent examples to build. The examples that use the same fluent job API jar
+                are compiled together.
+            build_dir: The directory where the class files and jar files will be placed. It must
+                exist for as long as the examples may be launched.
+
+        Returns:
+            None if compilation was successful or there was nothing to compile; an `OozieSubprocessResult` otherwise.
+
+        """
+
+        examples_by_jar: Dict[Path, List[FluentExampleBase]] = {}
+        for example in examples:
+            examples_by_jar.setdefault(example.fluent_job_api_jar, []).append(example)
+
+        for (fluent_job_api_jar, jar_examples) in examples_by_jar.items():
+            source_files = [example.path_to_source_file for example in jar_examples]
+            build_process_result = fluent_build.compile_sources(fluent_job_api_jar, source_files, build_dir)
+            if build_process_result.returncode != 0:
+                return OozieSubprocessResult.from_process_result("Failed to build the fluent job examples.",
+                                                                 build_process_result)
+
+        jar_results = fluent_build.package_jars([example.class_name for example in examples], build_dir, build_dir)
+
+        for (example, jar_result) in zip(examples, jar_results):
+            example.set_built(build_dir, jar_result if isinstance(jar_result, Path) else None)
+
+        return None
+
+    def set_built(self, classes_dir: Path, jar_path: Optional[Path]) -> None:
+        """
+        Records that the example has been built by `build_examples`, so that `build_example` does not build it again.
+
+        Args:
+            classes_dir: The directory containing the compiled class file of the example.
+            jar_path: The path to the packaged jar file of the example, or None if packaging failed. In that
+                case, `build_example` packages the example again from the class file in `classes_dir`.
+
+        """
+
+        self._classes_dir = classes_dir
+        self._jar_path = jar_path
+
     def build_example(self, tmp: str) -> Union[Path, OozieSubprocessResult]:
         """
-        Builds the fluent example in the provided (temporary) directory -
-        compiles the java source file and packages it in a jar.
+        Builds the fluent example in the provided (temporary) directory - compiles the java source file and packages
+        it in a jar. If the example has already been built by `build_examples`, the prebuilt jar file is returned.
 
         Args:
             tmp: The directory where the output of the build should be.
@@ -299,35 +350,42 @@ class FluentExampleBase(Example, metaclass=ABCMeta):
 
         """
 
-        packages = ["org", "apache", "oozie", "example", "fluentjob"]
-        java_file_name = self._class_name + ".java"
-        path_to_source_file = self._example_dir / "src" / "/".join(packages) / java_file_name
-        cmd_compile = ["javac",
-                       "-classpath", str(self._oozie_fluent_job_api_jar),
-                       str(path_to_source_file),
-                       "-d", tmp]
-        logging.info("Building fluent job example with command: %s", cmd_compile)
-        build_process_result = subprocess.run(cmd_compile, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        if build_process_result.returncode != 0:
-            return OozieSubprocessResult.from_process_result("Failed to build fluent job {}.".format(self.name()),
-                                                             build_process_result)
-
-        tmp_path = Path(tmp)
-        jar_path = tmp_path / "fluent_{}.jar".format(self.class_name)
-        class_file_name = self._class_name + ".class"
-        path_to_class_file = Path("/".join(packages)) / class_file_name
-        cmd_jar = ["jar", "cfe", str(jar_path), "{}.{}".format(".".join(packages), self._class_name),
-                   "-C", tmp,
-                   str(path_to_class_file)]
-
-        logging.info("Creating fluent job jar file with command: %s", cmd_jar)
-        jar_process_result = subprocess.run(cmd_jar, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        if jar_process_result.returncode != 0:
-            return OozieSubprocessResult.from_process_result(
-                "Failed to create jar file for fluent job {}.".format(self.name()),
-                jar_process_result)
-
-        return jar_path
+        if self._jar_path is not None:
+            return self._jar_path
+
+        classes_dir = self._classes_dir
+        if classes_dir is None:
+            build_process_result = fluent_build.compile_sources(self._oozie_fluent_job_api_jar,
+                                                                [self.path_to_source_file],
+                                                                Path(tmp))
+            if build_process_result.returncode != 0:
+                return OozieSubprocessResult.from_process_result("Failed to build fluent job {}.".format(self.name()),
+                                                                 build_process_result)
+
+            classes_dir = Path(tmp)
+
+        return self.package_jar(classes_dir, Path(tmp))
+
+    def package_jar(self, classes_dir: Path, output_dir: Path) -> Union[Path, OozieSubprocessResult]:
+        """
+        Packages the compiled class file of the example in a jar file.
+
+        Args:
+            classes_dir: The directory containing the compiled class files.
+            output_dir: The directory where the jar file will be placed.
+
+        Returns:
+            The path to the produced jar file if packaging was successful; an `OozieSubprocessResult` otherwise.
+
+        """
+
+        jar_result = fluent_build.package_jar(self._class_name, classes_dir, output_dir)
+        if isinstance(jar_result, Path):
+            return jar_result
+
+        return OozieSubprocessResult.from_process_result(
+            "Failed to create jar file for fluent job {}.".format(self.name()),
+            jar_result)
 
     @staticmethod
     def create_job_properties(job_properties_file: Path, options: List[str], oozie_version: str) -> None:
@@ -340,10 +398,9 @@ class FluentExampleBase(Example, metaclass=ABCMeta):
 
         """
 
-        with job_properties_file.open("w") as file:
-            job_options = ["queueName=default", "examplesRoot=examples", "projectVersion={}".format(oozie_version)]
-            job_options.extend(options)
-            file.write("\n".join(job_options))
+        job_options = ["queueName=default", "examplesRoot=examples", "projectVersion={}".format(oozie_version)]
+        job_options.extend(options)
+        job_properties_file.write_text("\n".join(job_options))
 
 # pylint: enable=abstract-method
 
@@ -354,8 +411,9 @@ class FluentExample(FluentExampleBase):
 
     def launch(self,
                cli_options: List[str],
-               poll_time: int,
-               timeout: int) -> report.ReportRecord:
+               poll_time: float,
+               timeout: int,
+               max_poll_time: float = MAX_POLL_TIME) -> report.ReportRecord:
         with tempfile.TemporaryDirectory() as tmp:
             jar_path: Union[Path, OozieSubprocessResult] = self.build_example(tmp)
             if isinstance(jar_path, OozieSubprocessResult):
@@ -369,16 +427,16 @@ class FluentExample(FluentExampleBase):
             job_properties_file = Path(tmp) / "job.properties"
             self.create_job_properties(job_properties_file, cli_options, self._oozie_version)
 
-            command = ["/opt/oozie/bin/oozie",
-                       "job",
-                       "-oozie",
-                       self._oozie_url,
-                       "-runjar",
-                       str(jar_path),
-                       "-config",
-                       str(job_properties_file)]
+            command = oozie_cli.job_command(self._oozie_url,
+                                         "-runjar", str(jar_path),
+                                         "-config", str(job_properties_file))
 
-            return _launch_and_wait_for_oozie_job(self._oozie_url, command, self.name(), poll_time, timeout)
+            return _launch_and_wait_for_oozie_job(self._oozie_url,
+                                                  command,
+                                                  self.name(),
+                                                  poll_time,
+                                                  timeout,
+                                                  max_poll_time)
 
 class FluentExampleValidateOnly(FluentExampleBase):
     """
@@ -387,8 +445,9 @@ class FluentExampleValidateOnly(FluentExampleBase):
 
     def launch(self,
                cli_options: List[str],
-               _poll_time: int,
-               _timeout: int) -> report.ReportRecord:
+               _poll_time: float,
+               _timeout: int,
+               _max_poll_time: float = MAX_POLL_TIME) -> report.ReportRecord:
         with tempfile.TemporaryDirectory() as tmp:
             jar_path: Union[Path, OozieSubprocessResult] = self.build_example(tmp)
             if isinstance(jar_path, OozieSubprocessResult):
@@ -398,15 +457,18 @@ class FluentExampleValidateOnly(FluentExampleBase):
                                            stdout=jar_path.stdout,
                                            stderr=jar_path.to_string())
 
-            command = ["/opt/oozie/bin/oozie", "job", "-oozie", self._oozie_url, "-validatejar", str(jar_path)]
+            command = oozie_cli.job_command(self._oozie_url, "-validatejar", str(jar_path))
 
             logging.info("Validating fluent example %s with command %s.", self.name(), command)
-            process_result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            process_result = subprocess.run(command,
+                                            stdout=subprocess.PIPE,
+                                            stderr=subprocess.PIPE,
+                                            universal_newlines=True)
             return_code = process_result.returncode
 
             final_status: report.Result
-            stdout = process_result.stdout.decode()
-            stderr = process_result.stderr.decode()
+            stdout = process_result.stdout
+            stderr = process_result.stderr
             if return_code == 0:
                 logging.info("Validation successful.")
                 final_status = report.Result.SUCCEEDED
@@ -429,11 +491,16 @@ def get_all_normal_examples(oozie_url: str, example_apps_dir: Path) -> Iterable[
 
     """
 
-    return map(lambda path: NormalExample(path, oozie_url), get_all_example_dirs(example_apps_dir))
+    return (NormalExample(path, oozie_url) for path in get_all_example_dirs(example_apps_dir))
 
+# The version of the Oozie server does not change during a run, so we only query it once per URL.
+@functools.lru_cache(maxsize=1)
 def get_oozie_version(oozie_url: str) -> str:
     """
-    Queries the Oozie server running on localhost and returns the Oozie version.
+    Queries the Oozie server and returns the Oozie version. The result is cached.
+
+    Args:
+        oozie_url: The URL of the Oozie server.
 
     Returns:
         The Oozie version.
@@ -443,12 +510,12 @@ def get_oozie_version(oozie_url: str) -> str:
     url_endpoint = "/v2/admin/build-version"
     url = oozie_url + url_endpoint
 
-    response = _send_request(url)
+    response = oozie_http.send_request(url)
 
     json_dict = json.loads(response)
     return json_dict["buildVersion"]
 
-def get_all_fluent_examples(oozie_url: str, example_dir: Path, validate_only: List[str]) -> Iterable[FluentExampleBase]:
+def get_all_fluent_examples(oozie_url: str, example_dir: Path, validate_only: List[str]) -> List[FluentExampleBase]:
     """
     Returns the fluent job examples contained in `example_dir`. For the examples the names of which
     is in the `validate_only` list, `FluentExampleValidateOnly` objects will be returned.
@@ -459,7 +526,7 @@ def get_all_fluent_examples(oozie_url: str, example_dir: Path, validate_only: Li
         validate_only: A list of fluent examples that should only be validated, not run.
 
      Returns:
-        An iterable over the Oozie fluent job examples.
+        A list of the Oozie fluent job examples.
 
     """
 
@@ -472,24 +539,19 @@ def get_all_fluent_examples(oozie_url: str, example_dir: Path, validate_only: Li
                         str(oozie_fluent_job_api_jar))
         return []
 
-    java_files: Iterable[Path] = (example_dir / "src" / "org" / "apache" / "oozie" / "example" / "fluentjob").iterdir()
+    source_dir = example_dir / "src" / fluent_build.FLUENT_JOB_PACKAGE_PATH
+    validate_only_set = frozenset(validate_only)
 
-    into_fluent_example_normal = lambda java_file: FluentExample(oozie_version,
-                                                                 oozie_fluent_job_api_jar,
-                                                                 example_dir,
-                                                                 java_file.name.strip(".java"),
-                                                                 oozie_url)
+    examples: List[FluentExampleBase] = []
+    for java_file in source_dir.iterdir():
+        if java_file.suffix != ".java":
+            continue
 
-    into_fluent_example_validate_only = lambda java_file: FluentExampleValidateOnly(oozie_version,
-                                                                                    oozie_fluent_job_api_jar,
-                                                                                    example_dir,
-                                                                                    java_file.name.strip(".java"),
-                                                                                    oozie_url)
-    into_fluent_example = lambda java_file: (into_fluent_example_validate_only(java_file)
-                                             if "Fluent_{}".format(java_file.stem) in validate_only
-                                             else into_fluent_example_normal(java_file))
+        example_class = (FluentExampleValidateOnly if FLUENT_EXAMPLE_PREFIX + java_file.stem in validate_only_set
+                         else FluentExample)
+        examples.append(example_class(oozie_version, oozie_fluent_job_api_jar, example_dir, java_file.stem, oozie_url))
 
-    return map(into_fluent_example, java_files)
+    return examples
 
 def get_all_example_dirs(example_dir: Path) -> Iterable[Path]:
     """
@@ -503,8 +565,7 @@ def get_all_example_dirs(example_dir: Path) -> Iterable[Path]:
 
     """
 
-    condition = lambda path: path.is_dir() and (path / "job.properties").exists()
-    return filter(condition, example_dir.iterdir())
+    return (path for (path, _) in _get_example_dirs_and_file_names(example_dir))
 
 def get_workflow_example_dirs(example_dir: Path) -> Iterable[Path]:
     """
@@ -518,14 +579,33 @@ def get_workflow_example_dirs(example_dir: Path) -> Iterable[Path]:
         An iterable over the Oozie workflow example directories.
 
     """
-    condition = lambda path: (not (path / "coordinator.xml").exists()
-                              and not (path / "bundle.xml").exists())
+    return (path for (path, file_names) in _get_example_dirs_and_file_names(example_dir)
+            if "coordinator.xml" not in file_names and "bundle.xml" not in file_names)
+
+def _get_example_dirs_and_file_names(example_dir: Path) -> Iterator[Tuple[Path, Set[str]]]:
+    # We use `os.scandir` because the directory entries it returns cache whether they are directories, and listing the
+    # contents of an example directory once is cheaper than checking the existence of the relevant files one by one.
+    with os.scandir(str(example_dir)) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                with os.scandir(entry.path) as example_entries:
+                    file_names = {example_entry.name for example_entry in example_entries}
 
-    return filter(condition, get_all_example_dirs(example_dir))
+                if "job.properties" in file_names:
+                    yield (Path(entry.path), file_names)
+
+def _get_job_info(oozie_url: str, job_id: str) -> Dict[str, Any]:
+    url_endpoint = "/v1/job/{}?show=info".format(job_id)
+    url = oozie_url + url_endpoint
+    response = oozie_http.send_request(url)
+
+    return json.loads(response)
 
 def query_job(oozie_url: str, job_id: str) -> Union[str, OozieSubprocessResult]:
     """
-    Queries and returns the status of an Oozie job.
+    Queries and returns the status of an Oozie job. The status is retrieved through the Oozie REST API, which returns
+    only the status as JSON. If that fails, the Oozie CLI is used as a fallback, which is much slower as it starts a
+    JVM and its human readable output has to be parsed.
 
     Args:
         oozie_url: The URL of the Oozie server.
@@ -537,67 +617,97 @@ def query_job(oozie_url: str, job_id: str) -> Union[str, OozieSubprocessResult]:
 
     """
 
-    query_command = ["/opt/oozie/bin/oozie",
-                     "job",
-                     "-oozie",
-                     oozie_url,
-                     "-info",
-                     job_id]
+    url_endpoint = "/v2/job/{}?show=status".format(job_id)
+    url = oozie_url + url_endpoint
 
-    query_process_result = subprocess.run(query_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    if query_process_result.returncode != 0:
-        return OozieSubprocessResult.from_process_result("Failed to query oozie job {}.".format(job_id),
-                                                         query_process_result)
+    try:
+        return json.loads(oozie_http.send_request(url))["status"]
+    # `OSError` covers the connection and HTTP errors of both `urllib` and `requests`, `ValueError` covers invalid JSON.
+    except (OSError, ValueError, KeyError) as ex:
+        logging.warning("Failed to query Oozie job %s through the REST API (%s), falling back to the Oozie CLI.",
+                        job_id,
+                        ex)
+        return _query_job_cli(oozie_url, job_id)
 
-    query_output = query_process_result.stdout.decode()
+def _query_job_cli(oozie_url: str, job_id: str) -> Union[str, OozieSubprocessResult]:
+    query_command = oozie_cli.job_command(oozie_url, "-info", job_id)
 
-    match = re.search("Status.*:(.*)\n", query_output)
-    if match is None:
-        raise ValueError("The status could not be determined for job id {}".format(job_id))
+    query_result = oozie_cli.run_and_search_output(query_command, oozie_cli.STATUS_RE)
 
-    status = match.group(1).strip()
+    if isinstance(query_result, str):
+        return query_result
+
+    if query_result.returncode != 0:
+        return OozieSubprocessResult.from_process_result("Failed to query oozie job {}.".format(job_id),
+                                                         query_result)
 
-    return status
+    raise ValueError("The status could not be determined for job id {}".format(job_id))
 
 def kill_job(oozie_url: str, job_id: str) -> int:
     """
-    Kills an Oozie job.
+    Kills an Oozie job through the Oozie REST API. If that fails, the Oozie CLI is used as a fallback.
 
     Args:
         oozie_url: The URL of the Oozie server.
         job_id: The job_id of the Oozie job.
 
     Returns:
-        The exit status of the subprocess that kills the Oozie job.
+        Zero if the job was killed through the REST API; otherwise the exit status
+        of the subprocess that kills the Oozie job.
 
     """
 
-    kill_command = ["/opt/oozie/bin/oozie",
-                    "job",
-                    "-oozie",
-                    oozie_url,
-                    "-kill",
-                    job_id]
+    url_endpoint = "/v1/job/{}?action=kill".format(job_id)
+    url = oozie_url + url_endpoint
 
-    process_result = subprocess.run(kill_command, stderr=subprocess.PIPE)
+    try:
+        oozie_http.send_request(url, method="PUT")
+        return 0
+    # `OSError` covers the connection and HTTP errors of both `urllib` and `requests`.
+    except OSError as ex:
+        logging.warning("Failed to kill Oozie job %s through the REST API (%s), falling back to the Oozie CLI.",
+                        job_id,
+                        ex)
+        return _kill_job_cli(oozie_url, job_id)
+
+def _kill_job_cli(oozie_url: str, job_id: str) -> int:
+    kill_command = oozie_cli.job_command(oozie_url, "-kill", job_id)
+
+    process_result = subprocess.run(kill_command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     return process_result.returncode
 
+def _log_kill_result(job_id: str, kill_future: "Future[int]") -> None:
+    exception = kill_future.exception()
+    if exception is not None:
+        logging.error("Failed to kill Oozie job %s: %s.", job_id, exception)
+    elif kill_future.result() != 0:
+        logging.warning("Killing Oozie job %s failed with exit code %s.", job_id, kill_future.result())
+
+# Maps the final statuses of the Oozie jobs to the corresponding results.
+_STATUS_TO_RESULT: Dict[str, report.Result] = {result.name: result for result in report.Result}
+
+# The statuses of jobs that have not finished yet. A job that has just been submitted may still be in PREP.
+PENDING_STATUSES: FrozenSet[str] = frozenset(("PREP", "RUNNING"))
+
 def wait_for_job_to_finish(oozie_url: str,
                            job_id: str,
                            name: str,
-                           poll_time:
-                           int = 1,
-                           timeout: int = 60) -> report.Result:
+                           poll_time: float = 1,
+                           timeout: int = 60,
+                           max_poll_time: float = MAX_POLL_TIME) -> report.Result:
     """
-    Waits for an Oozie job to finish, polling it regularly with a period of `poll_time`.
-    If the job does not finish before the given timeout is elapsed, it is killed.
+    Waits for an Oozie job to finish, polling it regularly. The job is polled right away, then after `poll_time`
+    seconds, and from then on the interval grows exponentially by `POLL_BACKOFF_FACTOR`, up to `max_poll_time`.
+    Polling stops as soon as the job is no longer in one of the `PENDING_STATUSES`. If the job does not finish
+    before the given timeout is elapsed, it is killed.
 
     Args:
         oozie_url: The URL of the Oozie server.
         job_id : The job_id of the Oozie job.
         name: The name of the example.
-        poll_time: The interval at which the job will be polled, in seconds.
+        poll_time: The initial interval at which the job will be polled, in seconds.
         timeout: The timeout value after which the job is killed, in seconds.
+        max_poll_time: The maximal interval between two polls of the job, in seconds.
 
     Returns:
         The job result.
@@ -605,29 +715,49 @@ def wait_for_job_to_finish(oozie_url: str,
     """
 
     start_time = time.time()
+    sleep_time = float(poll_time)
 
-    status: Union[str, OozieSubprocessResult] = query_job(oozie_url, job_id)
-    if isinstance(status, OozieSubprocessResult):
-        logging.warning(status.to_string())
+    while True:
+        status: Union[str, OozieSubprocessResult] = query_job(oozie_url, job_id)
+        if status not in PENDING_STATUSES:
+            break
+
+        remaining_time = timeout - (time.time() - start_time)
+        if remaining_time <= 0:
+            break
 
-    while status == "RUNNING" and (time.time() - start_time) < timeout:
-        time.sleep(poll_time)
-        status = query_job(oozie_url, job_id)
+        time.sleep(min(sleep_time, remaining_time))
+        sleep_time = min(sleep_time * POLL_BACKOFF_FACTOR, max_poll_time)
 
     # pylint: disable=no-else-return
-    if status == "RUNNING":
+    if status in PENDING_STATUSES:
         logging.info("Timed out waiting for example %s to finish, killing it.", name)
-        kill_job(oozie_url, job_id)
+
+        # The result is already known, so we do not wait for the job to be killed.
+        kill_future = _JOB_INFO_EXECUTOR.submit(kill_job, oozie_url, job_id)
+        kill_future.add_done_callback(functools.partial(_log_kill_result, job_id))
         return report.Result.TIMED_OUT
+    elif isinstance(status, OozieSubprocessResult):
+        logging.warning(status.to_string())
+        return report.Result.ERROR
     else:
         logging.info("Status: %s.", status)
-        return report.Result[status]
+
+        result = _STATUS_TO_RESULT.get(status)
+        if result is None:
+            logging.warning("Unexpected status %s of example %s.", status, name)
+            return report.Result.ERROR
+
+        return result
+
+def _is_selected(example_name: str, whitelist: Optional[FrozenSet[str]], blacklist: FrozenSet[str]) -> bool:
+    return example_name not in blacklist and (whitelist is None or example_name in whitelist)
 
 def _get_example_result(example: Example,
-                        whitelist: Optional[List[str]],
-                        blacklist: List[str],
+                        whitelist: Optional[FrozenSet[str]],
+                        blacklist: FrozenSet[str],
                         cli_options: Dict[str, List[str]],
-                        poll_time: int,
+                        poll_time: float,
                         timeout: int) -> report.ReportRecord:
     if example.name() in blacklist:
         logging.info("Skipping blacklisted example: %s.", example.name())
@@ -639,8 +769,8 @@ def _get_example_result(example: Example,
 
     logging.info("Running example %s.", example.name())
 
-    options = (cli_options.get("all", []))
-    options.extend(cli_options.get(example.name(), []))
+    # We build a new list to avoid modifying the lists stored in `cli_options`.
+    options = cli_options.get("all", []) + cli_options.get(example.name(), [])
 
     try:
         return example.launch(options, poll_time, timeout)
@@ -655,13 +785,16 @@ def _get_example_result(example: Example,
         return report.ReportRecord(example.name(), report.Result.ERROR, None, [], stderr=error_msg)
 
 def run_examples(examples: Iterable[Example],
-                 whitelist: Optional[List[str]],
-                 blacklist: List[str],
+                 whitelist: Optional[Iterable[str]],
+                 blacklist: Iterable[str],
                  cli_options: Dict[str, List[str]],
-                 poll_time: int = 1,
-                 timeout: int = 60) -> List[report.ReportRecord]:
+                 poll_time: float = 1,
+                 timeout: int = 60,
+                 max_workers: int = 1,
+                 record_callback: Optional[Callable[[report.ReportRecord], None]] = None) -> List[report.ReportRecord]:
     """
     Runs the Oozie examples contained in the directories in `examples`. Returns a dictionary of the results.
+    At most `max_workers` examples are run at the same time.
 
     Args:
         examples: An iterable of paths to directories containing individual Oozie examples.
@@ -672,22 +805,53 @@ def run_examples(examples: Iterable[Example],
             options will be added.
         poll_time: The interval at which the jobs will be polled, in seconds.
         timeout: The timeout value after which the jobs are killed, in seconds.
+        max_workers: The maximal number of examples that are run concurrently.
+        record_callback: If provided, it is called with each `ReportRecord` as soon as the example has finished,
+            in the order of completion. It is called on the thread that called `run_examples`.
 
     Returns:
-        A list of ReportRecord objects holding the results of running the examples.
+        A list of ReportRecord objects holding the results of running the examples,
+        in the same order as the examples.
 
     """
 
-    return list(map(
-        lambda example: _get_example_result(example, whitelist, blacklist, cli_options, poll_time, timeout),
-        examples))
+    # `frozenset` returns frozensets passed to it as they are, so the sets are not copied if the caller built them.
+    whitelist_set = frozenset(whitelist) if whitelist is not None else None
+    blacklist_set = frozenset(blacklist)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_get_example_result,
+                                   example,
+                                   whitelist_set,
+                                   blacklist_set,
+                                   cli_options,
+                                   poll_time,
+                                   timeout)
+                   for example in examples]
+
+        # We log the results as the examples finish, the records are returned in the original order.
+        for (finished, future) in enumerate(as_completed(futures), 1):
+            record = future.result()
+            logging.info("Example %s finished with result %s (%s/%s).",
+                         record.name,
+                         record.result.name,
+                         finished,
+                         len(futures))
+
+            if record_callback is not None:
+                record_callback(record)
+
+    return [future.result() for future in futures]
+
+_APPLICATION_PREFIX = "application"
 
 def _get_application_name_from_external_id(external_id: str) -> str:
-    if external_id.startswith("application"):
+    if external_id.startswith(_APPLICATION_PREFIX):
         return external_id
 
-    index = external_id.find("_")
-    return "application{}".format(external_id[index:])
+    # The external id of a MapReduce action is the id of its job, which has the form `job_<timestamp>_<number>`.
+    (_, separator, rest) = external_id.partition("_")
+    return _APPLICATION_PREFIX + separator + rest if separator else external_id
 
 def get_yarn_applications_of_job(oozie_url: str, job_id: str) -> List[str]:
     """
@@ -701,16 +865,12 @@ def get_yarn_applications_of_job(oozie_url: str, job_id: str) -> List[str]:
 
     """
 
-    url_endpoint = "/v1/job/{}?show=info".format(job_id)
-    url = oozie_url + url_endpoint
-    response = _send_request(url)
-
-    json_dict = json.loads(response)
+    json_dict = _get_job_info(oozie_url, job_id)
     actions = json_dict.get("actions", [])
 
-    yarn_actions = filter(lambda action: action["externalId"] is not None and action["externalId"] != "-", actions)
-    return list(map(lambda yarn_action: _get_application_name_from_external_id(yarn_action["externalId"]),
-                    yarn_actions))
+    return [_get_application_name_from_external_id(action["externalId"])
+            for action in actions
+            if action["externalId"] is not None and action["externalId"] != "-"]
 
 def default_cli_options() -> Dict[str, List[str]]:
     """
@@ -757,12 +917,20 @@ def get_argument_parser() -> argparse.ArgumentParser:
     parser.add_argument("-v", "--validate", nargs="*",
                         help="A list of fluent examples that should only be validated, not run.")
     parser.add_argument("-t", "--timeout", type=int, help="The timeout after which running examples are killed.")
+    parser.add_argument("-p", "--parallelism", type=int, default=1,
+                        help="The maximal number of examples that are run at the same time.")
     parser.add_argument("-l", "--logfile", help="The logfile.")
     parser.add_argument("-r", "--report_records",
-                        help="The file to which the report records will be written, as a pickled Python object.")
+                        help="The file to which the report records will be written, as JSON lines.")
 
     return parser
 
+def _write_report_record(file: TextIO, record: report.ReportRecord) -> None:
+    # Each record is written on its own line as soon as it is available, so that the results of the finished
+    # examples are kept even if the run is aborted.
+    file.write(json.dumps(record.to_dict()) + "\n")
+    file.flush()
+
 def main() -> None:
     """
     The entry point of the script.
@@ -777,22 +945,43 @@ def main() -> None:
                             level=logging.INFO,
                             filename=logfile)
 
-        oozie_url = _get_oozie_url()
+        oozie_url = oozie_http.get_oozie_url()
         logging.info("Using Oozie URL %s.", oozie_url)
 
+        oozie_cli.add_client_jvm_opts()
+
         examples = get_all_normal_examples(oozie_url, EXAMPLE_DIR / "apps")
         validate_only = args.validate if args.validate is not None else []
-        fluent_examples = get_all_fluent_examples(oozie_url, EXAMPLE_DIR, validate_only)
-        report_records = run_examples(itertools.chain(examples, fluent_examples),
-                                      args.whitelist,
-                                      args.blacklist if args.blacklist is not None else BLACKLIST,
-                                      default_cli_options(),
-                                      1,
-                                      args.timeout if args.timeout is not None else 180)
-
-        report_records_file = args.report_records if args.report_records is not None else "report_records.pickle"
-        with open(report_records_file, "wb") as file:
-            pickle.dump(report_records, file)
+
+        whitelist = frozenset(args.whitelist) if args.whitelist is not None else None
+        blacklist = frozenset(args.blacklist if args.blacklist is not None else BLACKLIST)
+
+        # Discovering the fluent examples needs the Oozie version from the server, so
+        # we skip it if no fluent example is whitelisted.
+        fluent_examples: List[FluentExampleBase] = []
+        if whitelist is None or any(name.startswith(FLUENT_EXAMPLE_PREFIX) for name in whitelist):
+            fluent_examples = get_all_fluent_examples(oozie_url, EXAMPLE_DIR, validate_only)
+        selected_fluent_examples = [example for example in fluent_examples
+                                    if _is_selected(example.name(), whitelist, blacklist)]
+
+        report_records_file = args.report_records if args.report_records is not None else "report_records.jsonl"
+
+        # The selected fluent examples are built together, before any example is run, in this directory.
+        with open(report_records_file, "w", encoding="utf-8") as file, tempfile.TemporaryDirectory() as build_dir:
+            build_result = FluentExampleBase.build_examples(selected_fluent_examples, Path(build_dir))
+            if build_result is not None:
+                logging.warning("Compiling the fluent examples together failed, they will be compiled one by one.\n%s",
+                                build_result.to_string())
+
+            # The examples are selected with the same sets as the fluent examples that were built.
+            report_records = run_examples(itertools.chain(examples, fluent_examples),
+                                          whitelist,
+                                          blacklist,
+                                          default_cli_options(),
+                                          1,
+                                          args.timeout if args.timeout is not None else 180,
+                                          args.parallelism,
+                                          functools.partial(_write_report_record, file))
 
     # We catch all exceptions to be able to log them.
     # pylint: disable=bare-except
@@ -801,7 +990,7 @@ def main() -> None:
         logging.error(tb_string)
         sys.exit(2)
 
-    if not all(map(lambda r: r.result == report.Result.SUCCEEDED or r.result == report.Result.SKIPPED, report_records)):
+    if not all(r.result in (report.Result.SUCCEEDED, report.Result.SKIPPED) for r in report_records):
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+"""
+This module provides functions to compile the Oozie fluent job examples and package them in jar files.
+Only the stderr of `javac` and `jar` is kept, as that is where they report errors.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import functools
+import logging
+
+from pathlib import Path
+
+import subprocess
+
+from typing import Iterable, List, Union
+
+# The maximal number of threads that package the jar files of the fluent job examples.
+PACKAGING_THREADS: int = 4
+
+# The java packages of the fluent job examples.
+FLUENT_JOB_PACKAGES: List[str] = ["org", "apache", "oozie", "example", "fluentjob"]
+
+# The directory of the fluent job examples relative to the source and class file roots, and their package name.
+FLUENT_JOB_PACKAGE_PATH = Path(*FLUENT_JOB_PACKAGES)
+FLUENT_JOB_PACKAGE_NAME = ".".join(FLUENT_JOB_PACKAGES)
+
+def compile_sources(fluent_job_api_jar: Path,
+                    source_files: Iterable[Path],
+                    output_dir: Path) -> subprocess.CompletedProcess:
+    """
+    Compiles the java source files of fluent job examples with a single `javac` invocation.
+
+    Args:
+        fluent_job_api_jar: The path to the Oozie fluent job API jar that the examples are compiled against.
+        source_files: The java source files of the examples.
+        output_dir: The directory where the class files will be placed.
+
+    Returns:
+        The `subprocess.CompletedProcess` object describing the `javac` process.
+
+    """
+
+    cmd_compile = ["javac",
+                   "-classpath", str(fluent_job_api_jar),
+                   *(str(source_file) for source_file in source_files),
+                   "-d", str(output_dir)]
+    logging.info("Building fluent job examples with command: %s", cmd_compile)
+    return subprocess.run(cmd_compile,
+                          stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE,
+                          universal_newlines=True)
+
+def package_jar(class_name: str, classes_dir: Path, output_dir: Path) -> Union[Path, subprocess.CompletedProcess]:
+    """
+    Packages the compiled class file of a fluent job example in a jar file.
+
+    Args:
+        class_name: The name of the java class of the fluent job example.
+        classes_dir: The directory containing the compiled class files.
+        output_dir: The directory where the jar file will be placed.
+
+    Returns:
+        The path to the produced jar file if packaging was successful; the `subprocess.CompletedProcess`
+        object describing the `jar` process otherwise.
+
+    """
+
+    jar_path = output_dir / "fluent_{}.jar".format(class_name)
+    path_to_class_file = FLUENT_JOB_PACKAGE_PATH / (class_name + ".class")
+    cmd_jar = ["jar", "cfe", str(jar_path), "{}.{}".format(FLUENT_JOB_PACKAGE_NAME, class_name),
+               "-C", str(classes_dir),
+               str(path_to_class_file)]
+
+    logging.info("Creating fluent job jar file with command: %s", cmd_jar)
+    jar_process_result = subprocess.run(cmd_jar,
+                                        stdout=subprocess.DEVNULL,
+                                        stderr=subprocess.PIPE,
+                                        universal_newlines=True)
+    if jar_process_result.returncode != 0:
+        return jar_process_result
+
+    return jar_path
+
+def package_jars(class_names: List[str],
+                 classes_dir: Path,
+                 output_dir: Path) -> List[Union[Path, subprocess.CompletedProcess]]:
+    """
+    Packages the compiled class files of several fluent job examples in jar files, see `package_jar`. The jar
+    files are packaged concurrently, using at most `PACKAGING_THREADS` threads.
+
+    Args:
+        class_names: The names of the java classes of the fluent job examples.
+        classes_dir: The directory containing the compiled class files.
+        output_dir: The directory where the jar files will be placed.
+
+    Returns:
+        The results of `package_jar` for the examples, in the order of `class_names`.
+
+    """
+
+    with ThreadPoolExecutor(max_workers=PACKAGING_THREADS) as executor:
+        package = functools.partial(package_jar, classes_dir=classes_dir, output_dir=output_dir)
+        return list(executor.map(package, class_names))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+"""
+This module provides functions to run the Oozie CLI in the Oozie server container.
+"""
+
+import os
+import re
+import subprocess
+import threading
+
+from typing import IO, List, Pattern, Union
+
+# The patterns used to extract information from the output of the Oozie CLI. They are matched against
+# the raw output so that only the matched part has to be decoded. The output is searched line by line, the id
+# of a launched job is on the line starting with "job:" and the status of the job itself on the line starting
+# with "Status".
+JOB_ID_RE = re.compile(rb"^job:\s*(\S+)")
+STATUS_RE = re.compile(rb"^Status\s*:\s*(\S+)")
+
+# The Oozie CLI wrapper script. We call it rather than `java` directly as it also reads the Oozie client
+# configuration and environment, see `add_client_jvm_opts`.
+OOZIE_CLI: str = "/opt/oozie/bin/oozie"
+
+def job_command(oozie_url: str, *args: str) -> List[str]:
+    """
+    Builds an `oozie job` command.
+
+    Args:
+        oozie_url: The URL of the Oozie server.
+        args: The arguments of the `oozie job` command.
+
+    Returns:
+        The command as an argument list.
+
+    """
+
+    return [OOZIE_CLI, "job", "-oozie", oozie_url, *args]
+
+def run_and_search_output(command: List[str], pattern: Pattern[bytes]) -> Union[str, subprocess.CompletedProcess]:
+    """
+    Runs the given command and reads its stdout line by line. As soon as a line matches `pattern`, the process is
+    terminated and the stripped first group of the match is decoded and returned, so we neither wait for the rest of
+    the output nor keep it in memory. Only the lines of stdout are matched, stderr is read separately.
+
+    Args:
+        command: The command to run.
+        pattern: The pattern to search for in the output of the command.
+
+    Returns:
+        The stripped first group of the match if a line of the output matched the pattern; otherwise the
+        `subprocess.CompletedProcess` object describing the finished process.
+
+    """
+
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+        assert process.stdout is not None and process.stderr is not None # For mypy.
+
+        # The stderr is read on another thread so that the process cannot block on a full stderr pipe.
+        stderr_chunks: List[bytes] = []
+        stderr_reader = threading.Thread(target=_read_stream, args=(process.stderr, stderr_chunks))
+        stderr_reader.start()
+
+        lines = []
+        for line in process.stdout:
+            match = pattern.search(line)
+            if match is not None:
+                process.terminate()
+                stderr_reader.join()
+                return match.group(1).strip().decode()
+
+            lines.append(line)
+
+        stderr_reader.join()
+        return_code = process.wait()
+
+    return subprocess.CompletedProcess(command, return_code, b"".join(lines).decode(), b"".join(stderr_chunks).decode())
+
+def _read_stream(stream: IO[bytes], chunks: List[bytes]) -> None:
+    chunks.append(stream.read())
+
+# JVM options that shorten the start-up of the short-lived Oozie CLI processes: they only send a few requests, so
+# the optimising JIT compiler and a parallel garbage collector do not pay off.
+OOZIE_CLIENT_JVM_OPTS: List[str] = ["-XX:TieredStopAtLevel=1", "-XX:+UseSerialGC"]
+
+def add_client_jvm_opts() -> None:
+    """
+    Adds `OOZIE_CLIENT_JVM_OPTS` to the `OOZIE_CLIENT_OPTS` environment variable, which is read by the Oozie CLI and
+    inherited by all Oozie CLI subprocesses. Options that are already present are not added again.
+
+    """
+
+    client_opts = os.environ.get("OOZIE_CLIENT_OPTS", "").split()
+    client_opts.extend(opt for opt in OOZIE_CLIENT_JVM_OPTS if opt not in client_opts)
+    os.environ["OOZIE_CLIENT_OPTS"] = " ".join(client_opts)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+"""
+This module provides functions to send HTTP requests to the Oozie REST API from the Oozie server container.
+"""
+
+import socket
+import subprocess
+import threading
+
+from typing import Dict, Optional, Tuple
+
+import http.client
+import urllib.error
+import urllib.parse
+
+# We try to import the modules needed for Kerberos HTTP requests.
+# If successful, we will use them, if not, we do not use kerberos.
+KERBEROS: bool
+try:
+    import requests
+    import requests_kerberos
+    KERBEROS = True
+except ModuleNotFoundError:
+    KERBEROS = False
+
+def _get_docker_long_fqdn() -> str:
+    get_ip_command = ["dig", "+short", socket.gethostname()]
+    ip_process_result = subprocess.run(get_ip_command,
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE,
+                                       universal_newlines=True,
+                                       check=True)
+    ip_addr = ip_process_result.stdout.strip()
+
+    reverse_dns_command = ["dig", "+short", "-x", ip_addr]
+    reverse_dns_process_result = subprocess.run(reverse_dns_command,
+                                                stdout=subprocess.PIPE,
+                                                stderr=subprocess.PIPE,
+                                                universal_newlines=True,
+                                                check=True)
+
+    # Delete the last '.' character that dig adds to the reverse DNS result.
+    fqdn = reverse_dns_process_result.stdout.strip()[:-1]
+    return fqdn
+
+def get_oozie_url() -> str:
+    """
+    Returns the URL of the Oozie server running on this host. If Kerberos is used, the URL contains the
+    fully qualified domain name of the host, otherwise "localhost".
+
+    Returns:
+        The URL of the Oozie server.
+
+    """
+
+    if KERBEROS:
+        hostname = _get_docker_long_fqdn()
+    else:
+        hostname = "localhost"
+
+    return "http://" + hostname + ":11000/oozie"
+
+# The HTTP connections to the Oozie server are kept open and reused. As `http.client.HTTPConnection`
+# and `requests.Session` objects are not thread safe, each thread has its own connections.
+_HTTP_CONNECTIONS = threading.local()
+
+# The annotation is a string because the `requests` module may not be available.
+def _get_kerberos_session() -> "requests.Session":
+    session = getattr(_HTTP_CONNECTIONS, "kerberos_session", None)
+    if session is None:
+        session = requests.Session()
+        session.auth = requests_kerberos.HTTPKerberosAuth(mutual_authentication=requests_kerberos.OPTIONAL)
+        _HTTP_CONNECTIONS.kerberos_session = session
+
+    return session
+
+def _send_request_kerberos(url: str, method: str) -> bytes:
+    response = _get_kerberos_session().request(method, url)
+    response.raise_for_status()
+    return response.content
+
+def _get_http_connection(netloc: str) -> http.client.HTTPConnection:
+    # The connections are keyed by the network location.
+    connections: Optional[Dict[str, http.client.HTTPConnection]] = getattr(_HTTP_CONNECTIONS, "connections", None)
+    if connections is None:
+        connections = {}
+        _HTTP_CONNECTIONS.connections = connections
+
+    connection = connections.get(netloc)
+    if connection is None:
+        connection = http.client.HTTPConnection(netloc)
+        connections[netloc] = connection
+
+    return connection
+
+def _drop_http_connection(netloc: str) -> None:
+    connections: Dict[str, http.client.HTTPConnection] = getattr(_HTTP_CONNECTIONS, "connections", {})
+    connection = connections.pop(netloc, None)
+    if connection is not None:
+        connection.close()
+
+def _send_request_on_kept_alive_connection(netloc: str,
+                                           method: str,
+                                           path: str) -> Tuple[http.client.HTTPResponse, bytes]:
+    connection = _get_http_connection(netloc)
+    try:
+        connection.request(method, path)
+        response = connection.getresponse()
+        return (response, response.read())
+    except (http.client.HTTPException, OSError):
+        _drop_http_connection(netloc)
+        raise
+
+def _send_request_unsecure(url: str, method: str) -> bytes:
+    split_url = urllib.parse.urlsplit(url)
+    path = split_url.path + ("?" + split_url.query if split_url.query else "")
+
+    try:
+        (response, body) = _send_request_on_kept_alive_connection(split_url.netloc, method, path)
+    except (http.client.HTTPException, OSError) as ex:
+        # Only GET requests are retried, other requests, for example killing a job, may already have taken effect.
+        if method != "GET":
+            # We raise an `OSError` to be consistent with `urllib.request.urlopen`.
+            raise urllib.error.URLError(ex) from ex
+
+        # The server may have closed the kept-alive connection in the meantime, we retry once on a new connection.
+        try:
+            (response, body) = _send_request_on_kept_alive_connection(split_url.netloc, method, path)
+        except (http.client.HTTPException, OSError) as retry_ex:
+            raise urllib.error.URLError(retry_ex) from retry_ex
+
+    if response.status >= 400:
+        raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+
+    return body
+
+def send_request(url: str, method: str = "GET") -> bytes:
+    """
+    Sends an HTTP request to the Oozie server, using Kerberos authentication if it is available. Without
+    Kerberos, the connections are kept alive and reused by the calling thread.
+
+    Args:
+        url: The URL of the request.
+        method: The HTTP method of the request.
+
+    Returns:
+        The raw body of the response. It is not decoded because `json.loads` accepts bytes, only the logs have
+        to be decoded.
+
+    Raises:
+        OSError: If the request failed or the server responded with an error status.
+
+    """
+
+    # pylint: disable=no-else-return
+    if KERBEROS:
+        return _send_request_kerberos(url, method)
+    else:
+        return _send_request_unsecure(url, method)
@@ -5,7 +5,7 @@ This module provides a class to store the results of and additional information
 """
 
 from enum import Enum, auto, unique
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 @unique
 class Result(Enum):
@@ -25,6 +25,9 @@ class ReportRecord:
     A class that stores the results of and additional information about an Oozie job that was run.
     """
 
+    # A record is created for every example that is run, so we do not need a `__dict__` per instance.
+    __slots__ = ("name", "result", "oozie_job_id", "applications", "stdout", "stderr")
+
     def __init__(self,
                  name: str,
                  result: Result,
@@ -51,3 +54,40 @@ class ReportRecord:
         self.applications = applications
         self.stdout = stdout
         self.stderr = stderr
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns a dictionary representation of this `ReportRecord` that can be serialised as JSON.
+        The result is stored by its name.
+
+        Returns:
+            A dictionary representation of this `ReportRecord`.
+
+        """
+
+        return {"name": self.name,
+                "result": self.result.name,
+                "oozie_job_id": self.oozie_job_id,
+                "applications": self.applications,
+                "stdout": self.stdout,
+                "stderr": self.stderr}
+
+    @staticmethod
+    def from_dict(record_dict: Dict[str, Any]) -> "ReportRecord":
+        """
+        Creates a `ReportRecord` object from its dictionary representation, as returned by `to_dict`.
+
+        Args:
+            record_dict: The dictionary representation of the `ReportRecord`.
+
+        Returns:
+            The `ReportRecord` object.
+
+        """
+
+        return ReportRecord(record_dict["name"],
+                            Result[record_dict["result"]],
+                            record_dict["oozie_job_id"],
+                            record_dict["applications"],
+                            record_dict.get("stdout"),
+                            record_dict.get("stderr"))
@@ -4,12 +4,14 @@
 This module provides functionality for generating junit style reports from the test results.
 """
 
-import io
+import functools
+import os
 
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
-import xml.etree.ElementTree as ET
+from xml.sax.saxutils import XMLGenerator
+from xml.sax.xmlreader import AttributesImpl
 
 # pylint: disable=useless-import-alias
 
@@ -17,122 +19,128 @@ import oozie_testing.inside_container.report as report
 
 # pylint: enable=useless-import-alias
 
-def _get_logs_for_yarn_application(application_id: str, report_and_log_dir: Path) -> Dict[str, Tuple[str, str]]:
-    """
-    Returns the logs for the given yarn application. The returned object is a dict, where the keys are the names of the
-    containers corresponding to the yarn application and the values are tuples the first elements of which are the
-    stdout and the second elements are the stderr outputs of their respective containers.
-
-    Args:
-        application_id: The id of the yarn application.
-        report_and_log_dir: The directory on the local file system where the yarn logs are located.
-
-    Returns:
-        A dictionary with the results. For details, see above.
-
-    """
-
+# The tags and attributes of the elements that describe the results of the test cases.
+# Succeeded test cases have no such element.
+_RESULT_ELEMENTS: Dict[report.Result, Tuple[Optional[str], Dict[str, str]]] = {
+    report.Result.SUCCEEDED : (None, {}),
+    report.Result.SKIPPED : ("skipped", {}),
+    report.Result.TIMED_OUT : ("failure", {"type" : "timeout"}),
+    report.Result.KILLED : ("failure", {"type" : "killed"}),
+    report.Result.FAILED : ("failure", {"type" : "failed"}),
+    report.Result.ERROR : ("error", {"type" : "error"})
+}
+
+# The headers that separate the output of the example runner from the Yarn logs in the system-out and system-err
+# elements.
+_YARN_STDOUT_HEADER = "\n\nYarn stdout:\n\n"
+_YARN_STDERR_HEADER = "\n\nYarn stderr:\n\n"
+
+def _container_dirs(application_id: str, report_and_log_dir: Path) -> List[Path]:
     application_path = (report_and_log_dir / "hadoop-logs" / application_id).expanduser().resolve()
 
     if not application_path.exists():
-        return {}
-
-    res: Dict[str, Tuple[str, str]] = {}
-    containers = filter(lambda dir_path: dir_path.is_dir() and dir_path.name.startswith("container"),
-                        application_path.iterdir())
-    for container in containers:
-        stdout_file = container / "stdout"
-        stdout_text: str
-
-        with stdout_file.open() as stdout:
-            stdout_text = stdout.read()
-
-        stderr_file = container / "stderr"
-        stderr_text: str
+        return []
 
-        with stderr_file.open() as stderr:
-            stderr_text = stderr.read()
+    # The entries returned by `os.scandir` usually know whether they are directories, so mostly no extra `stat` call
+    # is needed. Symlinks to directories are followed, as with `Path.is_dir`.
+    with os.scandir(str(application_path)) as entries:
+        return [Path(entry.path) for entry in entries
+                if entry.name.startswith("container") and entry.is_dir()]
 
-        res[container.name] = (stdout_text, stderr_text)
+# The size of the chunks in which the container logs are read when they are streamed into the report.
+LOG_CHUNK_SIZE: int = 64 * 1024
 
-    return res
-
-def _printable_logs_for_oozie_job(record: report.ReportRecord, report_and_log_dir: Path) -> Tuple[str, str]:
+def _iter_logs_for_oozie_job(record: report.ReportRecord, report_and_log_dir: Path, log_name: str) -> Iterator[str]:
     """
-    Returns a pair of strings, the first element of which is the aggregated stdout output of all containers
-    and applications corresponding to the given Oozie job, the second is the stderr output.
+    Yields the aggregated output of all containers and applications corresponding to the given Oozie job for one
+    of the outputs, in chunks, so that the log files do not have to be read into memory. The containers are read
+    one after the other.
 
     Args:
         record: The record containing information about the Oozie job.
         report_and_log_dir: The directory on the local file system where the yarn logs are located.
+        log_name: The name of the log files of the containers, "stdout" or "stderr".
 
     Returns:
-        A pair of strings, the first element of which is the aggregated stdout output of all containers
-        and applications corresponding to the given Oozie job, the second is the stderr output.
+        An iterator over the chunks of the aggregated log.
 
     """
 
-    stdout = io.StringIO()
-    stderr = io.StringIO()
-
     for application_id in record.applications:
-        application_header = "{asterisks}\n**{id}**\n{asterisks}\n\n".format(asterisks="*" * (len(application_id) + 4),
-                                                                             id=application_id)
-        stdout.write(application_header)
-        stderr.write(application_header)
-
-        container_logs = _get_logs_for_yarn_application(application_id, report_and_log_dir / "nodemanager")
-        for (container_id, (out, err)) in container_logs.items():
-            container_header = "**{}**\n\n".format(container_id)
-            stdout.write(container_header + out + "\n\n")
-            stderr.write(container_header + err + "\n\n")
-
-    return (stdout.getvalue(), stderr.getvalue())
-
-def generate_report(testsuite_name: str,
-                    report_records: List[report.ReportRecord],
-                    report_and_log_dir: Path) -> ET.ElementTree:
+        yield _application_header(application_id)
+
+        for container in _container_dirs(application_id, report_and_log_dir / "nodemanager"):
+            yield _container_header(container.name)
+            yield from _iter_log_chunks(container / log_name)
+            yield "\n\n"
+
+def _iter_log_chunks(log_file: Path) -> Iterator[str]:
+    # The logs of successful containers are often empty, those are not opened.
+    if log_file.stat().st_size > 0:
+        with log_file.open(encoding="utf-8") as file:
+            yield from iter(functools.partial(file.read, LOG_CHUNK_SIZE), "")
+
+def _application_header(application_id: str) -> str:
+    return "{asterisks}\n**{id}**\n{asterisks}\n\n".format(asterisks="*" * (len(application_id) + 4), id=application_id)
+
+def _container_header(container_id: str) -> str:
+    return "**{}**\n\n".format(container_id)
+
+def write_report(testsuite_name: str,
+                 report_records: Iterable[report.ReportRecord],
+                 report_and_log_dir: Path,
+                 xml_report_file: Path,
+                 number_of_records: Optional[int] = None) -> None:
     """
-    Generates a junit style xml from the test results.
+    Generates a junit style xml from the test results and writes it to a file. The document is written with a
+    streaming writer as it is produced, so no element tree is built and the container logs are copied into the
+    report in chunks instead of being read into memory.
 
     Args:
         testsuite_name: The name of the test suite.
-        report_records: A list of `ReportRecord` objects describing the results of the tests.
+        report_records: The `ReportRecord` objects describing the results of the tests. They are
+            consumed one at a time, so they can be read lazily.
         report_and_log_dir: The directory on the local file system where the yarn logs are located.
-
-    Returns:
-        An `ElementTree` object representing the xml document.
+        xml_report_file: The path of the xml file that will be written.
+        number_of_records: The number of records in `report_records`. If not provided, the
+            records are collected into a list to count them.
 
     """
 
-    testsuite = ET.Element("testsuite", attrib={"tests" : str(len(report_records))})
-
-    for record in report_records:
-        testcase = ET.Element("testcase", attrib={"classname" : testsuite_name, "name" : record.name})
-        result = record.result
-        if result == report.Result.SKIPPED:
-            ET.SubElement(testcase, "skipped")
-        elif result == report.Result.TIMED_OUT:
-            ET.SubElement(testcase, "failure", attrib={"type" : "timeout"})
-        elif result == report.Result.KILLED:
-            ET.SubElement(testcase, "failure", attrib={"type" : "killed"})
-        elif result == report.Result.FAILED:
-            ET.SubElement(testcase, "failure", attrib={"type" : "failed"})
-        elif result == report.Result.ERROR:
-            ET.SubElement(testcase, "error", attrib={"type" : "error"})
-        else:
-            assert result == report.Result.SUCCEEDED
-
-        # Aggregate the Yarn logs of the containers and add them to system-out and system-err elements.
-        (yarn_stdout, yarn_stderr) = _printable_logs_for_oozie_job(record, report_and_log_dir)
-        stdout_element = ET.SubElement(testcase, "system-out")
-        stdout_yarn_part = "\n\nYarn stdout:\n\n" + yarn_stdout
-        stdout_element.text = record.stdout + stdout_yarn_part if record.stdout is not None else stdout_yarn_part
-
-        stderr_element = ET.SubElement(testcase, "system-err")
-        stderr_yarn_part = "\n\nYarn stderr:\n\n" + yarn_stderr
-        stderr_element.text = record.stderr + stderr_yarn_part if record.stderr is not None else stderr_yarn_part
-
-        testsuite.append(testcase)
-
-    return ET.ElementTree(testsuite)
+    if number_of_records is None:
+        report_records = list(report_records)
+        number_of_records = len(report_records)
+
+    with xml_report_file.open("wb") as file:
+        writer = XMLGenerator(file, encoding="utf-8", short_empty_elements=True)
+        writer.startElement("testsuite", AttributesImpl({"tests" : str(number_of_records)}))
+
+        for record in report_records:
+            _write_testcase(writer, testsuite_name, record, report_and_log_dir)
+
+        writer.endElement("testsuite")
+        writer.endDocument()
+
+def _write_testcase(writer: XMLGenerator,
+                    testsuite_name: str,
+                    record: report.ReportRecord,
+                    report_and_log_dir: Path) -> None:
+    writer.startElement("testcase", AttributesImpl({"classname" : testsuite_name, "name" : record.name}))
+    (result_tag, result_attrib) = _RESULT_ELEMENTS[record.result]
+    if result_tag is not None:
+        writer.startElement(result_tag, AttributesImpl(result_attrib))
+        writer.endElement(result_tag)
+
+    # The logs are written in chunks as they are read, so that only one chunk of them is kept in memory at a time.
+    outputs = (("system-out", record.stdout, _YARN_STDOUT_HEADER, "stdout"),
+               ("system-err", record.stderr, _YARN_STDERR_HEADER, "stderr"))
+    for (tag, record_output, yarn_header, log_name) in outputs:
+        writer.startElement(tag, AttributesImpl({}))
+        if record_output is not None:
+            writer.characters(record_output)
+        writer.characters(yarn_header)
+        for chunk in _iter_logs_for_oozie_job(record, report_and_log_dir, log_name):
+            writer.characters(chunk)
+        writer.endElement(tag)
+
+    writer.endElement("testcase")
@@ -4,19 +4,33 @@
 This script is used to find and remove the docker images generated by the Jenkins job.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
+import itertools
 import logging
+import os
 
 from pathlib import Path
 
 import sys
 import traceback
 
-from typing import Iterable
+from typing import Iterable, List
 
 import yaml
 
 import test_env
 
+# The messages of this module are logged through its own logger instead of looking up the root logger on every call.
+_LOGGER = logging.getLogger(__name__)
+
+# We use the libyaml based loader if PyYAML was built with it, as it is much faster than the pure Python one.
+# We only need plain data, so a safe loader is sufficient.
+try:
+    _YAML_LOADER = yaml.CSafeLoader
+except AttributeError:
+    _YAML_LOADER = yaml.SafeLoader # type: ignore
+
 def images_to_remove(build_output_dir: Path) -> Iterable[str]:
     """
     Returns an iterable with the names of the docker images that were generated by the Jenkins job.
@@ -28,57 +42,77 @@ def images_to_remove(build_output_dir: Path) -> Iterable[str]:
         An iterable with the names of the docker images that were generated by the Jenkins job.
     """
 
-    build_config_dirs = build_output_dir.expanduser().resolve().iterdir()
-
-    for build_config_dir in build_config_dirs:
-        filename = "output_configuration.yaml"
-        output_config_file = build_config_dir / filename
-
-        if not output_config_file.is_file():
-            logging.warning("No %s file found in directory %s, cannot remove docker images.",
-                            filename,
-                            str(build_config_dir))
-        else:
-            try:
-                text: str
-                with output_config_file.open() as output_file:
-                    text = output_file.read()
-
-                yaml_dict = yaml.load(text)
-
-                components_in_order = yaml_dict["component-order"]
-                for component_name in reversed(components_in_order):
-                    component_dict = yaml_dict["components"][component_name]
-                    if not component_dict["reused"]:
-                        image_name = component_dict["image_name"]
-                        yield image_name
-            # pylint: disable=broad-except
-            # We want to catch all exceptions to continue the cleanup.
-            except Exception as exception:
-            # pylint: enable=broad-except
-                exception_msg = traceback.format_exception_only(type(exception), exception)[0].strip()
-                logging.warning("The following exception occured while checking the yaml file \"%s\" looking "
-                                "for images to be removed: \"%s\". Couldn't remove images of that BuildConfiguration.",
-                                str(output_config_file),
-                                exception_msg)
+    return list(itertools.chain.from_iterable(image_groups_to_remove(build_output_dir)))
+
+def image_groups_to_remove(build_output_dir: Path) -> List[List[str]]:
+    """
+    Returns the names of the docker images that were generated by the Jenkins job, grouped by `dbd` output directory.
+    Within a group, the images are in the order in which they can be removed.
+
+    Args:
+        build_output_dir: The directory in which the `dbd` output directories were generated.
+
+    Returns:
+        A list with one list of image names for each `dbd` output directory.
+    """
 
+    # `os.scandir` returns the file types together with the names, so no extra `stat` call is needed per entry.
+    # Only directories can be `dbd` output directories.
+    with os.scandir(str(build_output_dir)) as entries:
+        build_config_dirs = [Path(entry.path) for entry in entries if entry.is_dir()]
+
+    if not build_config_dirs:
+        return []
+
+    # The configuration files are independent, so they are read and parsed concurrently.
+    with ThreadPoolExecutor(max_workers=min(8, len(build_config_dirs))) as executor:
+        return list(executor.map(_images_of_build_config, build_config_dirs))
+
+# The name of the file in the `dbd` output directories that describes the generated images.
+OUTPUT_CONFIGURATION_FILENAME = "output_configuration.yaml"
+
+def _images_of_build_config(build_config_dir: Path) -> List[str]:
+    output_config_file = build_config_dir / OUTPUT_CONFIGURATION_FILENAME
+
+    if not output_config_file.is_file():
+        _LOGGER.warning("No %s file found in directory %s, cannot remove docker images.",
+                        OUTPUT_CONFIGURATION_FILENAME,
+                        str(build_config_dir))
+        return []
+
+    try:
+        # The file is opened in binary mode so that the YAML reader decodes it itself.
+        with output_config_file.open("rb") as output_file:
+            yaml_dict = yaml.load(output_file, Loader=_YAML_LOADER)
+
+        image_names = []
+        components = yaml_dict["components"]
+        for component_name in reversed(yaml_dict["component-order"]):
+            component_dict = components[component_name]
+            if not component_dict["reused"]:
+                image_names.append(component_dict["image_name"])
+
+        return image_names
+    # pylint: disable=broad-except
+    # We want to catch all exceptions to continue the cleanup.
+    except Exception as exception:
+    # pylint: enable=broad-except
+        exception_msg = traceback.format_exception_only(type(exception), exception)[0].strip()
+        _LOGGER.warning("The following exception occured while checking the yaml file \"%s\" looking "
+                        "for images to be removed: \"%s\". Couldn't remove images of that BuildConfiguration.",
+                        str(output_config_file),
+                        exception_msg)
+        return []
 
 def main() -> None:
     """
     The entry point of the script.
     """
 
-    build_output_dir = Path(sys.argv[1])
-
-    for image_name in images_to_remove(build_output_dir.expanduser().resolve()):
-        try:
-            test_env.docker_remove_image(image_name)
-        # pylint: disable=broad-except
-        # We want to catch all exceptions to continue the cleanup.
-        except Exception:
-        # pylint: enable=broad-except
-            error_msg = traceback.format_exc()
-            logging.warning("Couldn't delete image, continuing with the next one (if any):\n%s.", error_msg)
+    build_output_dir = Path(sys.argv[1]).expanduser().resolve()
+
+    # The images of different build configurations are removed concurrently.
+    test_env.docker_remove_image_groups(image_groups_to_remove(build_output_dir))
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -4,24 +4,24 @@
 This module contains functions that can be used to set up the docker environment for integration testing.
 """
 
-import errno
+import functools
 import logging
+import os
+import shutil
+import socket
 import subprocess
 import sys
 import time
 
 from typing import List
 
-def _is_command_available(command: str) -> bool:
-    try:
-        subprocess.run([command], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    except OSError as error:
-        if error.errno == errno.ENOENT:
-            return False
-
-        raise
+# The logger of the docker setup, created once at import.
+_LOGGER = logging.getLogger(__name__)
 
-    return True
+# Whether a command is installed does not change while the tests run, so we only look it up once.
+@functools.lru_cache(maxsize=None)
+def _is_command_available(command: str) -> bool:
+    return shutil.which(command) is not None
 
 def is_docker_command_available() -> bool:
     """
@@ -54,11 +54,33 @@ def is_docker_daemon_running() -> bool:
 
     """
 
-    command = ["docker", "version"]
-    process_result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    for docker_socket in DOCKER_SOCKETS:
+        if os.path.exists(docker_socket):
+            return _ping_docker_socket(docker_socket)
+
+    # The daemon may be reachable in another way, for example through a named pipe or `DOCKER_HOST`.
+    # `docker info` with a format prints a single short line instead of the full client and server version trees.
+    command = ["docker", "info", "--format", "{{.ServerVersion}}"]
+    process_result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
     return process_result.returncode == 0
 
+# The default Unix sockets of the docker daemon on Linux and on MacOS, in the order they are tried.
+DOCKER_SOCKETS = ("/var/run/docker.sock", os.path.expanduser("~/.docker/run/docker.sock"))
+
+def _ping_docker_socket(docker_socket_path: str) -> bool:
+    # We ask the daemon directly through its socket, which is much cheaper than running the docker command.
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as docker_socket:
+            docker_socket.settimeout(5)
+            docker_socket.connect(docker_socket_path)
+            docker_socket.sendall(b"GET /_ping HTTP/1.0\r\n\r\n")
+            response = docker_socket.recv(64)
+    except OSError:
+        return False
+
+    return response.startswith(b"HTTP/1.0 200") or response.startswith(b"HTTP/1.1 200")
+
 class DockerError(Exception):
     """
     An exception used in the integration tests for problems concerning Docker.
@@ -66,18 +88,21 @@ class DockerError(Exception):
     pass
 
 def _wait_for_docker_daemon_to_start(timeout: int) -> None:
-    logging.info("Waiting for docker daemon to start.")
+    _LOGGER.info("Waiting for docker daemon to start.")
 
+    # We poll often at first so that we notice quickly if the daemon starts fast, then back off.
     start = time.time()
+    sleep_time = 0.025
     while not is_docker_daemon_running() and (time.time() - start) < timeout:
-        time.sleep(1)
+        time.sleep(sleep_time)
+        sleep_time = min(sleep_time * 2, 1)
 
     if not is_docker_daemon_running():
         msg = "Timed out waiting for docker daemon to start."
-        logging.error(msg)
+        _LOGGER.error(msg)
         raise DockerError(msg)
 
-    logging.info("Docker daemon is running.")
+    _LOGGER.info("Docker daemon is running.")
 
 def start_docker_daemon() -> None:
     """
@@ -89,7 +114,7 @@ def start_docker_daemon() -> None:
 
     """
 
-    logging.info("Starting docker daemon.")
+    _LOGGER.info("Starting docker daemon.")
 
     command: List[str]
     if sys.platform.startswith("linux"):
@@ -98,7 +123,7 @@ def start_docker_daemon() -> None:
         command = ["open", "--background", "-a", "Docker"]
     else:
         msg = "Unsupported operating system: {}.".format(sys.platform)
-        logging.error(msg)
+        _LOGGER.error(msg)
         raise DockerError(msg)
 
     process_result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
@@ -111,7 +136,7 @@ def start_docker_daemon() -> None:
                + "****************").format(process_result.returncode,
                                             process_result.stdout.decode(),
                                             process_result.stderr.decode())
-        logging.error(msg)
+        _LOGGER.error(msg)
         raise DockerError(msg)
 
     _wait_for_docker_daemon_to_start(120)
@@ -127,12 +152,12 @@ def ensure_docker_daemon_running() -> None:
     """
 
     if is_docker_daemon_running():
-        logging.info("Docker daemon is running.")
+        _LOGGER.info("Docker daemon is running.")
         return
 
     if not is_docker_command_available():
         msg = "Docker does not seem to be installed: missing command `docker`."
-        logging.error(msg)
+        _LOGGER.error(msg)
         raise DockerError(msg)
 
     start_docker_daemon()
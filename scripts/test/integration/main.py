@@ -14,7 +14,7 @@ from pathlib import Path
 import re
 import sys
 
-from typing import Any, Iterable, List, Optional
+from typing import Any, Iterable, List, Optional, Pattern
 
 import unittest
 
@@ -29,17 +29,22 @@ def iterate_tests(test_suite_or_case: Iterable[Any]) -> Iterable[Any]:
     """
     Iterate through all of the test cases in 'test_suite_or_case'.
 
-    Copied from https://stackoverflow.com/questions/15487587/python-unittest-get-testcase-ids-from-nested-testsuite.
+    Based on https://stackoverflow.com/questions/15487587/python-unittest-get-testcase-ids-from-nested-testsuite.
 
     """
-    try:
-        suite = iter(test_suite_or_case)
-    except TypeError:
-        yield test_suite_or_case
-    else:
-        for test in suite:
-            for subtest in iterate_tests(test):
-                yield subtest
+    # We walk the nested suites with an explicit stack of iterators instead of recursive generators.
+    stack = [iter([test_suite_or_case])]
+    while stack:
+        try:
+            test = next(stack[-1])
+        except StopIteration:
+            stack.pop()
+            continue
+
+        try:
+            stack.append(iter(test))
+        except TypeError:
+            yield test
 
 def get_argument_parser() -> argparse.ArgumentParser:
     """
@@ -55,20 +60,20 @@ def get_argument_parser() -> argparse.ArgumentParser:
 
     return parser
 
-def any_regex_matches(string: str, regexes: List[str]) -> bool:
+def any_regex_matches(string: str, regexes: List[Pattern[str]]) -> bool:
     """
     Checks whether any of the provided regexes matches the given string.
 
     Args:
         string: The string that will be checked agains the regexes.
-        regexes: A list of regular expressions.
+        regexes: A list of compiled regular expressions.
 
     Returns:
         True if any of `regexes` matches `string`; false otherwise.
 
     """
 
-    return any(map(lambda regex: re.fullmatch(regex, string), regexes))
+    return any(regex.fullmatch(string) for regex in regexes)
 
 def filter_tests(tests: Iterable[Any], filter_test_regexes: Optional[List[str]]) -> Iterable[Any]:
     """
@@ -86,11 +91,66 @@ def filter_tests(tests: Iterable[Any], filter_test_regexes: Optional[List[str]])
     """
 
     if filter_test_regexes is not None:
-        regexes: List[str] = filter_test_regexes
+        regexes = [re.compile(regex) for regex in filter_test_regexes]
         return filter(lambda test: any_regex_matches(test.id(), regexes), tests)
 
     return tests
 
+# Matches regexes that begin with a literal test module name followed by an escaped dot that is not quantified.
+_MODULE_PREFIX_RE = re.compile(r"\^?(test_\w+)\\\.(?![?*+{])")
+
+def modules_of_test_regexes(filter_test_regexes: Optional[List[str]]) -> Optional[List[str]]:
+    """
+    Returns the names of the test modules that the tests matched by the given regexes can be in, if they can be
+    determined from the regexes alone. This is the case if every regex starts with a literal module name followed
+    by an escaped dot, for example "test_docker_interaction\\..*", and contains no alternation, which could allow
+    tests of other modules.
+
+    Args:
+        filter_test_regexes: An optional list of regular expressions that the test ids are matched against.
+
+    Returns:
+        A list with the names of the test modules, or None if all test modules have to be searched.
+
+    """
+
+    if filter_test_regexes is None:
+        return None
+
+    module_names = []
+    for regex in filter_test_regexes:
+        match = _MODULE_PREFIX_RE.match(regex)
+        if match is None or "|" in regex:
+            return None
+
+        module_names.append(match.group(1))
+
+    return sorted(set(module_names))
+
+def discover_tests(directory: Path, filter_test_regexes: Optional[List[str]]) -> List[Any]:
+    """
+    Discovers the tests in the given directory. If the regexes only allow tests from certain modules,
+    only those modules are imported.
+
+    Args:
+        directory: The directory in which the tests are discovered.
+        filter_test_regexes: An optional list of regular expressions that the test ids are matched against.
+
+    Returns:
+        A list of the discovered tests. The tests are not yet filtered by the regexes.
+
+    """
+
+    module_names = modules_of_test_regexes(filter_test_regexes)
+    patterns = ["test_*.py"] if module_names is None else [module_name + ".py" for module_name in module_names]
+
+    loader = unittest.TestLoader()
+
+    # We walk the discovered suites only once.
+    return [test
+            for pattern in patterns
+            for test in iterate_tests(loader.discover(str(directory), pattern=pattern))]
+
 def main() -> None:
     """
     The entry point of the script.
@@ -104,9 +164,8 @@ def main() -> None:
     docker_setup.ensure_docker_daemon_running()
 
     this_directory = Path(__main__.__file__).expanduser().resolve().parent
-    discovered = unittest.TestLoader().discover(str(this_directory))
-
-    tests = filter_tests(iterate_tests(discovered), args.tests)
+    all_tests = discover_tests(this_directory, args.tests)
+    tests = filter_tests(all_tests, args.tests)
 
     suite = unittest.TestSuite(tests)
     unittest.TextTestRunner(verbosity=2).run(suite)
@@ -3,6 +3,7 @@
 # pylint: disable=missing-docstring
 
 from pathlib import Path
+from typing import Dict, Set
 
 import tempfile
 
@@ -14,13 +15,23 @@ import test_env
 
 IMAGE = "frolvlad/alpine-oraclejdk8"
 
+# A single docker client is shared by all tests of the module so that its connection to the daemon is reused.
+_DOCKER: docker.DockerClient
+
+def setUpModule() -> None: # pylint: disable=invalid-name
+    global _DOCKER # pylint: disable=global-statement
+    _DOCKER = docker.from_env()
+
+def tearDownModule() -> None: # pylint: disable=invalid-name
+    _DOCKER.close()
+
 def _write_to_file(file_path: Path, text: str) -> None:
     with file_path.open("w") as file:
         file.write(text)
 
 class TestDockerCopying(unittest.TestCase):
     def setUp(self) -> None:
-        self.container = docker.from_env().containers.run(IMAGE, detach=True, auto_remove=True, tty=True)
+        self.container = _DOCKER.containers.run(IMAGE, detach=True, auto_remove=True, tty=True)
 
     def tearDown(self) -> None:
         self.container.remove(force=True)
@@ -93,16 +104,21 @@ class TestDockerCopying(unittest.TestCase):
             with self.assertRaises(test_env.DockerSubprocessException):
                 test_env.docker_cp_from_container(self.container.name, "dummy_file.txt", str(nonexistent_destination))
 
+def _compose_labels(project_name: str, service_name: str) -> Dict[str, str]:
+    return {"com.docker.compose.project" : project_name, "com.docker.compose.service" : service_name}
+
 class TestDockerFindingContainers(unittest.TestCase):
     def test_find_oozie_and_nodemanager(self) -> None:
+        # The containers are found by the labels that docker-compose sets on them.
+        project_name = "test_find_containers"
         try:
-            oozieserver = docker.from_env().containers.run(IMAGE, detach=True, auto_remove=True,
-                                                           tty=True, name="oozieserver")
-            nodemanager = docker.from_env().containers.run(IMAGE, detach=True, auto_remove=True,
-                                                           tty=True, name="nodemanager")
+            oozieserver = _DOCKER.containers.run(IMAGE, detach=True, auto_remove=True, tty=True, name="oozieserver",
+                                                 labels=_compose_labels(project_name, "oozieserver"))
+            nodemanager = _DOCKER.containers.run(IMAGE, detach=True, auto_remove=True, tty=True, name="nodemanager",
+                                                 labels=_compose_labels(project_name, "nodemanager"))
 
-            found_oozieserver = test_env.get_oozieserver()
-            found_nodemanager = test_env.get_nodemanager()
+            found_oozieserver = test_env.get_oozieserver(project_name)
+            found_nodemanager = test_env.get_nodemanager(project_name)
 
             self.assertEqual(oozieserver, found_oozieserver)
             self.assertEqual(nodemanager, found_nodemanager)
@@ -110,6 +126,10 @@ class TestDockerFindingContainers(unittest.TestCase):
             oozieserver.remove(force=True)
             nodemanager.remove(force=True)
 
+def _compose_services(project_filter: str) -> Set[str]:
+    containers = _DOCKER.containers.list(filters={"label" : project_filter})
+    return {container.labels["com.docker.compose.service"] for container in containers}
+
 class TestDockerCompose(unittest.TestCase):
     docker_compose_text = """
 version: '3'
@@ -124,8 +144,10 @@ services:
     def test_docker_compose_up_and_down_ok(self) -> None:
         with tempfile.TemporaryDirectory() as tempdir_name:
             tempdir = Path(tempdir_name).expanduser().resolve()
-            first_service_name = tempdir.name + "_first_service_1"
-            second_service_name = tempdir.name + "_second_service_1"
+
+            # The services are looked up by their labels, as `docker compose` and `docker-compose` name the
+            # containers differently.
+            project_filter = "com.docker.compose.project={}".format(test_env.compose_project_name(tempdir.name))
 
             try:
                 docker_compose_file = tempdir / "docker-compose.yaml"
@@ -133,15 +155,10 @@ services:
 
                 test_env.docker_compose_up(tempdir)
 
-                container_names = list(map(lambda container: container.name, docker.from_env().containers.list()))
-
-                self.assertTrue(first_service_name in container_names)
-                self.assertTrue(second_service_name in container_names)
+                self.assertEqual({"first_service", "second_service"}, _compose_services(project_filter))
             finally:
                 test_env.docker_compose_down(tempdir)
-                new_container_names = list(map(lambda container: container.name, docker.from_env().containers.list()))
-                self.assertFalse(first_service_name in new_container_names)
-                self.assertFalse(second_service_name in new_container_names)
+                self.assertEqual(set(), _compose_services(project_filter))
 
     def test_docker_compose_up_fails_no_compose_file(self) -> None:
         with tempfile.TemporaryDirectory() as tempdir_name:
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+
+# pylint: disable=missing-docstring
+
+import unittest
+
+import main
+
+class TestModulesOfTestRegexes(unittest.TestCase):
+    def test_literal_module_prefix(self) -> None:
+        self.assertEqual(["test_docker_interaction", "test_with_cluster"],
+                         main.modules_of_test_regexes(["^test_with_cluster\\..*", "test_docker_interaction\\.TestA"]))
+
+    def test_alternation_searches_all_modules(self) -> None:
+        self.assertIsNone(main.modules_of_test_regexes(["test_docker_interaction\\..*|test_with_cluster\\..*"]))
+        self.assertIsNone(main.modules_of_test_regexes(["test_docker_interaction\\.TestA|.*TestWithCluster.*"]))
+
+    def test_no_module_prefix_searches_all_modules(self) -> None:
+        self.assertIsNone(main.modules_of_test_regexes([".*TestWithCluster.*"]))
+        self.assertIsNone(main.modules_of_test_regexes(["test_docker_interaction.*"]))
+        self.assertIsNone(main.modules_of_test_regexes(["test_docker_interaction\\.?.*"]))
+        self.assertIsNone(main.modules_of_test_regexes(["(?i)test_docker_interaction\\..*"]))
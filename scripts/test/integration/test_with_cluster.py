@@ -2,10 +2,15 @@
 
 # pylint: disable=missing-docstring
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable, List
+from typing import Any, Dict, Iterable, List
 
+import json
+import os
+import re
 import unittest
+import uuid
 
 import docker
 
@@ -13,115 +18,161 @@ import oozie_testing.inside_container.example_runner
 import oozie_testing.inside_container.report
 import test_env
 
+# The line in which `within_cluster_testing.py` prints the exit codes of the batched commands.
+_BATCH_RESULT_RE = re.compile(r"^__RESULTS__ (.*)$", re.MULTILINE)
+
 class TestWithCluster(unittest.TestCase):
     reports_dir = Path("testing/reports")
     timeout = 180
     build_config_dir = Path("docker_compose_resources")
+
+    # Each run uses its own docker-compose project so that the containers of concurrent runs do not collide.
+    # A cluster kept with `KEEP_CLUSTER=1` can be reused by setting `CLUSTER_PROJECT_NAME` to the same name. The name
+    # is normalised like docker-compose does, so that it matches the project labels of the containers.
+    project_name = test_env.compose_project_name(
+        os.environ.get("CLUSTER_PROJECT_NAME") or "witc_{}_{}".format(os.getpid(), uuid.uuid4().hex[:6]))
     oozieserver: docker.models.containers.Container = None
+    docker_client: docker.DockerClient = None
+
+    # The arguments of `within_cluster_testing.py` for each command that the tests check. The commands are
+    # independent and mostly wait for the cluster, so they are all run concurrently by a single invocation of the
+    # script when the cluster is up and the tests only check their results. The build directories differ so that the
+    # builds do not collide.
+    within_cluster_commands: Dict[str, List[str]] = {
+        "normal_ok" : ["--run-normal", "java-main"],
+        "normal_wrong_name" : ["--run-normal", "java-main-wrong-name"],
+        "build_fluent_ok" : ["--build-fluent", "JavaMain", "build_dir_ok"],
+        "build_fluent_wrong_name" : ["--build-fluent", "JavaMain_Wrong_Name", "build_dir_wrong_name"],
+        "fluent_ok" : ["--run-fluent", "JavaMain"]
+    }
+    results: Dict[str, int] = {}
+    build_dir_contents: Dict[str, List[str]] = {}
 
     @classmethod
     def setUpClass(cls) -> None:
         import within_cluster_testing
 
-        test_env.docker_compose_up(TestWithCluster.build_config_dir)
+        # The same client is used for all checks of the cluster state.
+        TestWithCluster.docker_client = docker.from_env()
+
+        # If the id of the Oozie server of a running cluster is given, that cluster is used
+        # and it is left running after the tests.
+        reuse_cluster_id = os.environ.get("REUSE_CLUSTER_ID")
+        if reuse_cluster_id:
+            reused_oozieserver = TestWithCluster.docker_client.containers.get(reuse_cluster_id)
+            TestWithCluster.project_name = reused_oozieserver.labels["com.docker.compose.project"]
 
-        # Assert that Hadoop and Oozie are running.
-        TestWithCluster._check_cluster_running()
+        # A cluster left running by an earlier run with `KEEP_CLUSTER=1` is reused.
+        cluster_was_running = TestWithCluster._is_cluster_running()
+        if not cluster_was_running:
+            test_env.docker_compose_up(TestWithCluster.build_config_dir, TestWithCluster.project_name)
 
-        TestWithCluster.oozieserver = test_env.get_oozieserver()
+            # Assert that Hadoop and Oozie are running.
+            TestWithCluster._check_cluster_running()
+
+        TestWithCluster.oozieserver = test_env.get_oozieserver(TestWithCluster.project_name)
         inside_container = Path(oozie_testing.inside_container.__file__).parent.expanduser().resolve()
-        test_env.setup_testing_env_in_container(TestWithCluster.oozieserver, inside_container)
 
-        # Assert examples are extracted and uploaded
-        TestWithCluster._check_examples_extracted()
-        TestWithCluster._check_examples_uploaded_to_hdfs()
+        # The scripts are always copied as they may have changed since the cluster was started.
+        test_env.docker_put_archive_to_container(TestWithCluster.oozieserver, inside_container, "/opt/oozie/")
+        if not (cluster_was_running and TestWithCluster._are_examples_uploaded_to_hdfs()):
+            test_env.upload_examples_to_hdfs(TestWithCluster.oozieserver)
+
+        # Assert examples are extracted and uploaded. The checks are independent `docker exec` calls, so they are run
+        # concurrently.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            checks = [executor.submit(TestWithCluster._check_examples_extracted),
+                      executor.submit(TestWithCluster._check_examples_uploaded_to_hdfs)]
+            for check in checks:
+                check.result()
 
         # Copy the testing file to the containerx
-        test_env.docker_cp_to_container(TestWithCluster.oozieserver.name,
-                                        str(Path(within_cluster_testing.__file__).expanduser().resolve()),
-                                        "/opt/oozie/inside_container")
+        test_env.docker_put_archive_to_container(TestWithCluster.oozieserver,
+                                                 Path(within_cluster_testing.__file__),
+                                                 "/opt/oozie/inside_container")
+
+        batch_results = TestWithCluster._run_within_cluster_commands()
+        TestWithCluster.results = batch_results.get("exit_codes", {})
+        TestWithCluster.build_dir_contents = batch_results.get("build_dir_contents", {})
 
     @classmethod
     def tearDownClass(cls) -> None:
-        test_env.docker_compose_down(TestWithCluster.build_config_dir)
+        if not (os.environ.get("KEEP_CLUSTER") or os.environ.get("REUSE_CLUSTER_ID")):
+            test_env.docker_compose_down(TestWithCluster.build_config_dir, TestWithCluster.project_name)
 
-    def test_launching_normal_example_ok(self) -> None:
-        example_name = "java-main"
-        cmd = "python3 /opt/oozie/inside_container/within_cluster_testing.py --run-normal {}".format(example_name)
+        TestWithCluster.docker_client.close()
 
-        (return_code, _) = TestWithCluster.oozieserver.exec_run(cmd, workdir="/opt/oozie")
+    @staticmethod
+    def _run_within_cluster_commands() -> Dict[str, Any]:
+        # The script runs all commands in one process, so the interpreter is only started once
+        # and only one `docker exec` is needed. It also lists the build directories.
+        cmd = ["python3", "/opt/oozie/inside_container/within_cluster_testing.py",
+               "--batch", json.dumps(TestWithCluster.within_cluster_commands)]
+        (_, output) = TestWithCluster.oozieserver.exec_run(cmd, workdir="/opt/oozie")
 
-        self.assertEqual(0, return_code)
+        match = _BATCH_RESULT_RE.search(output.decode(errors="replace"))
+        return json.loads(match.group(1)) if match is not None else {}
 
-    def test_launching_normal_example_wrong_name(self) -> None:
-        example_name = "java-main-wrong-name"
-        cmd = "python3 /opt/oozie/inside_container/within_cluster_testing.py --run-normal {}".format(example_name)
+    def _return_code(self, key: str) -> int:
+        self.assertIn(key, TestWithCluster.results, "No exit code was printed for command {}.".format(key))
+        return TestWithCluster.results[key]
 
-        (return_code, _) = TestWithCluster.oozieserver.exec_run(cmd, workdir="/opt/oozie")
-        self.assertNotEqual(0, return_code)
+    def test_launching_normal_example_ok(self) -> None:
+        self.assertEqual(0, self._return_code("normal_ok"))
 
-    def test_building_fluent_example_ok(self) -> None:
-        example_class_name = "JavaMain"
-        build_dir = "build_dir"
-        cmd = "python3 /opt/oozie/inside_container/within_cluster_testing.py --build-fluent {} {}".format(
-            example_class_name,
-            build_dir)
+    def test_launching_normal_example_wrong_name(self) -> None:
+        self.assertNotEqual(0, self._return_code("normal_wrong_name"))
 
-        (return_code, _) = TestWithCluster.oozieserver.exec_run(cmd, workdir="/opt/oozie")
-        self.assertEqual(0, return_code)
+    def test_building_fluent_example_ok(self) -> None:
+        self.assertEqual(0, self._return_code("build_fluent_ok"))
 
         # Check if the example was really built on the filesystem.
-        (return_code_ls, output_ls) = TestWithCluster.oozieserver.exec_run("ls {}".format(build_dir),
-                                                                           workdir="/opt/oozie")
-        self.assertEqual(0, return_code_ls)
-
-        build_dir_contents = output_ls.decode().split()
+        self.assertIn("build_fluent_ok", TestWithCluster.build_dir_contents)
+        build_dir_contents = TestWithCluster.build_dir_contents["build_fluent_ok"]
         self.assertTrue("org" in build_dir_contents)
         self.assertTrue(any(map(lambda name: name.endswith(".jar"), build_dir_contents)))
 
     def test_building_fluent_example_wrong_name(self) -> None:
-        example_class_name = "JavaMain_Wrong_Name"
-        build_dir = "build_dir"
-        cmd = "python3 /opt/oozie/inside_container/within_cluster_testing.py --build-fluent {} {}".format(
-            example_class_name,
-            build_dir)
-
-        (return_code, _) = TestWithCluster.oozieserver.exec_run(cmd, workdir="/opt/oozie")
-        self.assertNotEqual(0, return_code)
+        self.assertNotEqual(0, self._return_code("build_fluent_wrong_name"))
 
     def test_launching_fluent_example_ok(self) -> None:
-        example_class_name = "JavaMain"
-        cmd = "python3 /opt/oozie/inside_container/within_cluster_testing.py --run-fluent {}".format(example_class_name)
-
-        (return_code, _) = TestWithCluster.oozieserver.exec_run(cmd, workdir="/opt/oozie")
-        self.assertEqual(0, return_code)
+        self.assertEqual(0, self._return_code("fluent_ok"))
 
     @staticmethod
     def _check_cluster_running() -> None:
-        docker_client = docker.from_env()
-
-        containers: Iterable[docker.models.containers.Container] = docker_client.containers.list()
-        container_names: List[str] = list(map(lambda container: container.name, containers))
-
-        service_names = ["oozieserver", "historyserver", "namenode", "resourcemanager", "nodemanager", "datanode"]
+        project_filter = {"label" : "com.docker.compose.project={}".format(TestWithCluster.project_name)}
+        containers: Iterable[docker.models.containers.Container] = TestWithCluster.docker_client.containers.list(
+            filters=project_filter)
 
-        among_services = lambda service_name: any(map(lambda container_name: service_name in container_name,
-                                                      container_names))
+        # The services of the containers are read from their docker-compose labels, not guessed from their names.
+        running = {container.labels.get("com.docker.compose.service") for container in containers}
 
-        not_running = list(filter(lambda service_name: not among_services(service_name), service_names))
+        service_names = {"oozieserver", "historyserver", "namenode", "resourcemanager", "nodemanager", "datanode"}
+        not_running = service_names - running
         if not_running:
-            raise ValueError("The following docker services are running: {}.".format(not_running))
+            raise ValueError("The following docker services are not running: {}.".format(sorted(not_running)))
 
     @staticmethod
     def _check_examples_extracted() -> None:
-        (return_code, _) = TestWithCluster.oozieserver.exec_run("ls examples")
+        (return_code, _) = TestWithCluster.oozieserver.exec_run(["ls", "examples"])
 
         if return_code != 0:
             raise ValueError("The Oozie examples are not extracted.")
 
     @staticmethod
-    def _check_examples_uploaded_to_hdfs() -> None:
-        (return_code, _) = TestWithCluster.oozieserver.exec_run("hdfs dfs -ls examples")
+    def _is_cluster_running() -> bool:
+        try:
+            TestWithCluster._check_cluster_running()
+            return True
+        except ValueError:
+            return False
 
-        if return_code != 0:
+    @staticmethod
+    def _are_examples_uploaded_to_hdfs() -> bool:
+        (return_code, _) = TestWithCluster.oozieserver.exec_run(["hdfs", "dfs", "-ls", "examples"])
+        return return_code == 0
+
+    @staticmethod
+    def _check_examples_uploaded_to_hdfs() -> None:
+        if not TestWithCluster._are_examples_uploaded_to_hdfs():
             raise ValueError("The Oozie examples are not uploaded to HDFS.")
@@ -7,9 +7,14 @@ It contains functions that run or build examples.
 
 import argparse
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, List
 
+import json
+import os
 import sys
+import traceback
 
 if __name__ == "__main__":
     # We only import these if this file is run as the main script. As the main script, it is to run on
@@ -22,12 +27,28 @@ if __name__ == "__main__":
     import report
     # pylint: enable=import-error
 
-def run_normal_example(path: Path, oozie_url: str) -> int:
+# The url of the Oozie server when this script runs inside the Oozie server container.
+OOZIE_URL = "http://localhost:11000/oozie"
+
+# The initial interval at which the jobs are polled, in seconds. The interval grows with every poll, see
+# `example_runner.wait_for_job_to_finish`, so jobs that finish quickly are noticed early without polling long
+# running jobs too often.
+POLL_TIME = 0.25
+
+# The timeout after which the jobs are killed, in seconds.
+TIMEOUT = 180
+
+# The maximal interval between two polls of a job, in seconds. It is lower than the default of
+# `example_runner.MAX_POLL_TIME` so that the short jobs of the tests are noticed soon after they finish.
+MAX_POLL_TIME = 5
+
+def run_normal_example(path: Path, oozie_url: str = OOZIE_URL) -> int:
     """
     Runs a normal (non-fluent) example.
 
     Args:
         path: The path to the directory containing the example files.
+        oozie_url: The url of the Oozie server.
 
     Returns:
         Zero if the example ran successfully; a non-zero value otherwise.
@@ -37,9 +58,9 @@ def run_normal_example(path: Path, oozie_url: str) -> int:
     example = example_runner.NormalExample(path, oozie_url)
     cli_options = example_runner.default_cli_options()
 
-    options = (cli_options.get("all", []))
-    options.extend(cli_options.get(example.name(), []))
-    report_record = example.launch(options, 1, 180)
+    # We build a new list to avoid modifying the lists stored in `cli_options`.
+    options = cli_options.get("all", []) + cli_options.get(example.name(), [])
+    report_record = example.launch(options, POLL_TIME, TIMEOUT, MAX_POLL_TIME)
 
     # pylint: disable=no-else-return
     if report_record.result == report.Result.SUCCEEDED:
@@ -47,32 +68,37 @@ def run_normal_example(path: Path, oozie_url: str) -> int:
     else:
         return 2
 
-def run_fluent_example(example_dir: Path, class_name: str, oozie_url: str) -> int:
+def _fluent_job_api_jar(example_dir: Path, oozie_version: str) -> Path:
+    return example_dir.expanduser().resolve().parent / "lib" / "oozie-fluent-job-api-{}.jar".format(oozie_version)
+
+def _create_fluent_example(example_dir: Path, class_name: str, oozie_url: str) -> "example_runner.FluentExample":
+    oozie_version = example_runner.get_oozie_version(oozie_url)
+    oozie_fluent_job_api_jar = _fluent_job_api_jar(example_dir, oozie_version)
+
+    return example_runner.FluentExample(oozie_version, oozie_fluent_job_api_jar, example_dir, class_name, oozie_url)
+
+def run_fluent_example(example_dir: Path, class_name: str, oozie_url: str = OOZIE_URL) -> int:
     """
     Runs a fluent example.
 
     Args:
         example_dir: The path to the directory containing the Oozie examples.
         class_name: The name of the java class of the fluent job example.
+        oozie_url: The url of the Oozie server.
 
     Returns:
         Zero if the example ran successfully; a non-zero value otherwise.
 
     """
 
-    oozie_version = example_runner.get_oozie_version(oozie_url)
-
-    lib = example_dir.expanduser().resolve().parent / "lib"
-    oozie_fluent_job_api_jar = lib / "oozie-fluent-job-api-{}.jar".format(oozie_version)
-
-    example = example_runner.FluentExample(oozie_version, oozie_fluent_job_api_jar, example_dir, class_name, oozie_url)
+    example = _create_fluent_example(example_dir, class_name, oozie_url)
 
     cli_options = example_runner.default_cli_options()
 
-    options = (cli_options.get("all", []))
-    options.extend(cli_options.get(example.name(), []))
+    # We build a new list to avoid modifying the lists stored in `cli_options`.
+    options = cli_options.get("all", []) + cli_options.get(example.name(), [])
 
-    report_record = example.launch(options, 1, 180)
+    report_record = example.launch(options, POLL_TIME, TIMEOUT, MAX_POLL_TIME)
 
     # pylint: disable=no-else-return
     if report_record.result == report.Result.SUCCEEDED:
@@ -80,7 +106,7 @@ def run_fluent_example(example_dir: Path, class_name: str, oozie_url: str) -> in
     else:
         return 2
 
-def build_fluent_example(example_dir: Path, class_name: str, build_dir: Path, oozie_url: str) -> int:
+def build_fluent_example(example_dir: Path, class_name: str, build_dir: Path, oozie_url: str = OOZIE_URL) -> int:
     """
     Builds a fluent example.
 
@@ -88,18 +114,14 @@ def build_fluent_example(example_dir: Path, class_name: str, build_dir: Path, oo
         example_dir: The path to the directory containing the Oozie examples.
         class_name: The name of the java class of the fluent job example.
         build_dir: The directory in which the build results will be placed.
+        oozie_url: The url of the Oozie server.
 
     Returns:
         Zero if the example was built successfully; a non-zero value otherwise.
 
     """
 
-    oozie_version = example_runner.get_oozie_version(oozie_url)
-
-    lib = example_dir.expanduser().resolve().parent / "lib"
-    oozie_fluent_job_api_jar = lib / "oozie-fluent-job-api-{}.jar".format(oozie_version)
-
-    example = example_runner.FluentExample(oozie_version, oozie_fluent_job_api_jar, example_dir, class_name, oozie_url)
+    example = _create_fluent_example(example_dir, class_name, oozie_url)
 
     result = example.build_example(str(build_dir))
 
@@ -127,36 +149,124 @@ def get_argument_parser() -> argparse.ArgumentParser:
                        nargs=2,
                        help="The first argument is the name of the Java class, the second " +
                        "is the directory where the built files should be located.")
+    group.add_argument("--batch",
+                       help="A JSON object mapping keys to argument lists of this script. The commands are run "
+                       "concurrently in this process, then their exit codes and the contents of the build directories "
+                       "are printed as a JSON object in a line starting with {}.".format(BATCH_RESULT_PREFIX))
 
     return parser
 
+# The prefix of the line containing the exit codes of the commands in batch mode.
+BATCH_RESULT_PREFIX = "__RESULTS__ "
+
+# The directory of the Oozie examples in the Oozie server container. It is expanded once, when the script starts.
 EXAMPLE_DIR: Path = Path("~/examples").expanduser()
 
-def main() -> None:
-    """
-    The entry point of the script.
+def run_command(args: argparse.Namespace, oozie_url: str = OOZIE_URL) -> int:
     """
+    Runs the command described by the parsed command line arguments.
 
-    args = get_argument_parser().parse_args()
-    oozie_url = "http://localhost:11000/oozie"
+    Args:
+        args: The parsed command line arguments.
+        oozie_url: The url of the Oozie server.
+
+    Returns:
+        Zero if the command was successful; a non-zero value otherwise.
+
+    """
 
     if args.run_normal:
-        path = Path("~/examples/apps").expanduser().resolve() / args.run_normal
-        res = run_normal_example(path, oozie_url)
+        path = (EXAMPLE_DIR / "apps").resolve() / args.run_normal
+        return run_normal_example(path, oozie_url)
+
     if args.run_fluent:
         class_name = args.run_fluent
-        res = run_fluent_example(EXAMPLE_DIR, class_name, oozie_url)
+        return run_fluent_example(EXAMPLE_DIR, class_name, oozie_url)
+
+    class_name = args.build_fluent[0]
+    build_dir_name = args.build_fluent[1]
+
+    build_dir = Path(build_dir_name).expanduser().resolve()
+    build_dir.mkdir(exist_ok=True)
 
-    if args.build_fluent:
-        class_name = args.build_fluent[0]
-        build_dir_name = args.build_fluent[1]
+    return build_fluent_example(EXAMPLE_DIR, class_name, build_dir, oozie_url)
+
+def run_batch(parser: argparse.ArgumentParser,
+              commands: Dict[str, List[str]],
+              oozie_url: str = OOZIE_URL) -> Dict[str, int]:
+    """
+    Runs the given commands concurrently in this process, so that the interpreter
+    is only started and the modules are only imported once for all of them.
+
+    Args:
+        parser: The argument parser of this script, see `get_argument_parser`.
+        commands: A dictionary mapping keys to argument lists of this script. The argument
+            lists must not contain `--batch`.
+        oozie_url: The url of the Oozie server.
+
+    Returns:
+        A dictionary mapping the keys to the exit codes of their commands.
+
+    """
+
+    parsed_commands = [parser.parse_args(arguments) for arguments in commands.values()]
+
+    def run_one(args: argparse.Namespace) -> int:
+        # An exception would make the command exit with a non-zero code if it was run on its own.
+        try:
+            return run_command(args, oozie_url)
+        # pylint: disable=broad-except
+        except Exception:
+        # pylint: enable=broad-except
+            traceback.print_exc()
+            return 1
+
+    with ThreadPoolExecutor(max_workers=max(1, len(parsed_commands))) as executor:
+        return dict(zip(commands.keys(), executor.map(run_one, parsed_commands)))
+
+def build_dir_contents(parser: argparse.ArgumentParser, commands: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """
+    Lists the build directories of the `--build-fluent` commands among the given commands, so that the
+    caller can check the build results without listing the directories itself.
+
+    Args:
+        parser: The argument parser of this script, see `get_argument_parser`.
+        commands: A dictionary mapping keys to argument lists of this script.
+
+    Returns:
+        A dictionary mapping the keys of the `--build-fluent` commands whose build directory exists
+        to the sorted names of the files in it.
+
+    """
+
+    result = {}
+    for (key, arguments) in commands.items():
+        args = parser.parse_args(arguments)
+        if args.build_fluent:
+            build_dir = Path(args.build_fluent[1]).expanduser().resolve()
+            if build_dir.is_dir():
+                result[key] = sorted(os.listdir(str(build_dir)))
+
+    return result
+
+def main() -> None:
+    """
+    The entry point of the script.
+    """
 
-        build_dir = Path(build_dir_name).expanduser().resolve()
-        build_dir.mkdir(exist_ok=True)
+    # The parser is built only once and also used for the commands of a batch.
+    parser = get_argument_parser()
+    args = parser.parse_args()
+    oozie_url = OOZIE_URL
 
-        res = build_fluent_example(EXAMPLE_DIR, class_name, build_dir, oozie_url)
+    if args.batch:
+        commands = json.loads(args.batch)
+        results = {"exit_codes" : run_batch(parser, commands, oozie_url),
+                   "build_dir_contents" : build_dir_contents(parser, commands)}
+        print(BATCH_RESULT_PREFIX + json.dumps(results), flush=True)
+        sys.exit(0)
 
-    sys.exit(res)
+    sys.exit(run_command(args, oozie_url))
 
 if __name__ == "__main__":
     main()
@@ -31,7 +31,6 @@ option2=B"""
                 options,
                 oozie_version)
 
-            with job_properties_file.open() as file:
-                result = file.read()
+            result = job_properties_file.read_text()
 
             self.assertEqual(expected_result, result)
@@ -4,9 +4,10 @@
 
 from pathlib import Path
 
+import shutil
 import tempfile
 
-from typing import List
+from typing import Dict, List, Optional
 
 import unittest
 import xml.etree.ElementTree as ET
@@ -36,37 +37,55 @@ class TestOutput(unittest.TestCase):
     error_stdout = "Stdout message"
     error_stderr = "Stderr message"
 
-    def test_generate_report(self) -> None:
-        generated_report = TestOutput._get_report()
+    # The log directory and the report written from it are shared by the tests, as they only read them.
+    log_dir: Path
+    generated_report: ET.ElementTree
 
-        root = generated_report.getroot()
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.log_dir = Path(tempfile.mkdtemp())
+        TestOutput._fill_directory_with_logs(cls.log_dir)
 
-        self._check_skipped(root)
-        self._check_timeout(root)
-        self._check_killed(root)
-        self._check_failed_test(root)
-        self._check_error(root)
+        report_file = cls.log_dir / "report.xml"
+        output.write_report("Testsuite_name", TestOutput._create_report_records(), cls.log_dir, report_file)
+        cls.generated_report = ET.parse(str(report_file))
 
-    def _check_skipped(self, root: ET.Element) -> None:
-        skipped = root.find("testcase[@name='skipped_test']")
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(str(cls.log_dir))
+
+    def test_write_report(self) -> None:
+        root = TestOutput.generated_report.getroot()
+
+        # The test cases are indexed by name once instead of being searched for in every check.
+        testcases = {testcase.get("name") : testcase for testcase in root.iter("testcase")}
+
+        self._check_skipped(testcases)
+        self._check_timeout(testcases)
+        self._check_killed(testcases)
+        self._check_failed_test(testcases)
+        self._check_error(testcases)
+
+    def _check_skipped(self, testcases: Dict[Optional[str], ET.Element]) -> None:
+        skipped = testcases.get("skipped_test")
         self.assertIsNotNone(skipped)
         assert skipped is not None # Mypy does not recognise unittest assertions.
         self.assertIsNotNone(skipped.find("skipped"))
 
-    def _check_timeout(self, root: ET.Element) -> None:
-        timeout = root.find("testcase[@name='timeout_test']")
+    def _check_timeout(self, testcases: Dict[Optional[str], ET.Element]) -> None:
+        timeout = testcases.get("timeout_test")
         self.assertIsNotNone(timeout)
         assert timeout is not None # Mypy does not recognise unittest assertions.
         self.assertIsNotNone(timeout.find("failure[@type='timeout']"))
 
-    def _check_killed(self, root: ET.Element) -> None:
-        killed = root.find("testcase[@name='killed_test']")
+    def _check_killed(self, testcases: Dict[Optional[str], ET.Element]) -> None:
+        killed = testcases.get("killed_test")
         self.assertIsNotNone(killed)
         assert killed is not None # Mypy does not recognise unittest assertions.
         self.assertIsNotNone(killed.find("failure[@type='killed']"))
 
-    def _check_failed_test(self, root: ET.Element) -> None:
-        failed = root.find("testcase[@name='failed_test']")
+    def _check_failed_test(self, testcases: Dict[Optional[str], ET.Element]) -> None:
+        failed = testcases.get("failed_test")
         self.assertIsNotNone(failed)
         assert failed is not None # Mypy does not recognise unittest assertions.
         self.assertIsNotNone(failed.find("failure[@type='failed']"))
@@ -93,8 +112,8 @@ class TestOutput(unittest.TestCase):
         self.assertTrue(TestOutput.failed_application1_cont_2_stderr in failed_stderr_text)
         self.assertTrue(TestOutput.failed_application2_cont_1_stderr in failed_stderr_text)
 
-    def _check_error(self, root: ET.Element) -> None:
-        error = root.find("testcase[@name='error_test']")
+    def _check_error(self, testcases: Dict[Optional[str], ET.Element]) -> None:
+        error = testcases.get("error_test")
         self.assertIsNotNone(error)
         assert error is not None # Mypy does not recognise unittest assertions.
         self.assertIsNotNone(error.find("error[@type='error']"))
@@ -138,43 +157,22 @@ class TestOutput(unittest.TestCase):
     def _application_name_to_container_name(application_name: str, container_number: int) -> str:
         return application_name.replace("application", "container") + "_01_" + str(container_number).zfill(6)
 
-    @staticmethod
-    def _write_file(file_path: Path, text: str) -> None:
-        with file_path.open("w") as file:
-            file.write(text)
-
     @staticmethod
     def _fill_directory_with_logs(log_dir: Path) -> None:
         logs = log_dir.expanduser().resolve() / "nodemanager" / "hadoop-logs"
-        logs.mkdir(parents=True, exist_ok=True)
-
-        application1 = logs / TestOutput.failed_application1_id
-        application1.mkdir()
-        application1_cont1 = (application1
-                              / TestOutput._application_name_to_container_name(TestOutput.failed_application1_id, 1))
-        application1_cont1.mkdir()
-        TestOutput._write_file(application1_cont1 / "stdout", TestOutput.failed_application1_cont_1_stdout)
-        TestOutput._write_file(application1_cont1 / "stderr", TestOutput.failed_application1_cont_1_stderr)
-
-        application1_cont2 = (application1
-                              / TestOutput._application_name_to_container_name(TestOutput.failed_application1_id, 2))
-        application1_cont2.mkdir()
-        TestOutput._write_file(application1_cont2 / "stdout", TestOutput.failed_application1_cont_2_stdout)
-        TestOutput._write_file(application1_cont2 / "stderr", TestOutput.failed_application1_cont_2_stderr)
-
-        application2 = logs / TestOutput.failed_application2_id
-        application2.mkdir()
-        application2_cont1 = (application2
-                              / TestOutput._application_name_to_container_name(TestOutput.failed_application2_id, 1))
-        application2_cont1.mkdir()
-        TestOutput._write_file(application2_cont1 / "stdout", TestOutput.failed_application2_cont_1_stdout)
-        TestOutput._write_file(application2_cont1 / "stderr", TestOutput.failed_application2_cont_1_stderr)
 
-    @staticmethod
-    def _get_report() -> ET.ElementTree:
-        with tempfile.TemporaryDirectory() as tempdir_name:
-            tempdir = Path(tempdir_name)
-            TestOutput._fill_directory_with_logs(tempdir)
-            report_records = TestOutput._create_report_records()
-            generated_report = output.generate_report("Testsuite_name", report_records, tempdir)
-            return generated_report
+        containers = [
+            (TestOutput.failed_application1_id, 1,
+             TestOutput.failed_application1_cont_1_stdout, TestOutput.failed_application1_cont_1_stderr),
+            (TestOutput.failed_application1_id, 2,
+             TestOutput.failed_application1_cont_2_stdout, TestOutput.failed_application1_cont_2_stderr),
+            (TestOutput.failed_application2_id, 1,
+             TestOutput.failed_application2_cont_1_stdout, TestOutput.failed_application2_cont_1_stderr)
+        ]
+
+        for (application_id, container_number, stdout, stderr) in containers:
+            container_dir = (logs / application_id
+                             / TestOutput._application_name_to_container_name(application_id, container_number))
+            container_dir.mkdir(parents=True)
+            (container_dir / "stdout").write_text(stdout)
+            (container_dir / "stderr").write_text(stderr)
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+
+# pylint: disable=missing-docstring
+
+import json
+
+import unittest
+
+# pylint: disable=useless-import-alias
+import oozie_testing.inside_container.report as report
+# pylint: enable=useless-import-alias
+
+class TestReportRecord(unittest.TestCase):
+    def test_json_round_trip(self) -> None:
+        record = report.ReportRecord("failed_test",
+                                     report.Result.FAILED,
+                                     "0000002-181015062156203-oozie-oozi-W",
+                                     ["application_1539599757230_0001"],
+                                     stdout="Stdout message",
+                                     stderr=None)
+
+        loaded = report.ReportRecord.from_dict(json.loads(json.dumps(record.to_dict())))
+
+        self.assertEqual(record.name, loaded.name)
+        self.assertEqual(record.result, loaded.result)
+        self.assertEqual(record.oozie_job_id, loaded.oozie_job_id)
+        self.assertEqual(record.applications, loaded.applications)
+        self.assertEqual(record.stdout, loaded.stdout)
+        self.assertEqual(record.stderr, loaded.stderr)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+# pylint: disable=missing-docstring
+
+from typing import List
+
+import unittest
+
+# pylint: disable=useless-import-alias
+import oozie_testing.inside_container.example_runner as example_runner
+import oozie_testing.inside_container.report as report
+# pylint: enable=useless-import-alias
+
+class DummyExample(example_runner.Example):
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self.cli_options: List[str] = []
+
+    def name(self) -> str:
+        return self._name
+
+    def launch(self,
+               cli_options: List[str],
+               poll_time: float,
+               timeout: int,
+               max_poll_time: float = example_runner.MAX_POLL_TIME) -> report.ReportRecord:
+        self.cli_options = cli_options
+        return report.ReportRecord(self._name, report.Result.SUCCEEDED, None, [])
+
+class TestRunExamples(unittest.TestCase):
+    def test_cli_options_are_not_shared_between_examples(self) -> None:
+        examples = [DummyExample("first"), DummyExample("second")]
+        cli_options = {"all": ["common=A"], "first": ["first=B"], "second": ["second=C"]}
+
+        example_runner.run_examples(examples, None, [], cli_options)
+
+        self.assertEqual(["common=A", "first=B"], examples[0].cli_options)
+        self.assertEqual(["common=A", "second=C"], examples[1].cli_options)
+        self.assertEqual(["common=A"], cli_options["all"])
+
+    def test_record_callback_is_called_for_each_example(self) -> None:
+        examples = [DummyExample("first"), DummyExample("second"), DummyExample("blacklisted")]
+        records: List[report.ReportRecord] = []
+
+        result = example_runner.run_examples(examples, None, ["blacklisted"], {}, record_callback=records.append)
+
+        self.assertEqual(["first", "second", "blacklisted"], [record.name for record in result])
+        self.assertCountEqual(result, records)
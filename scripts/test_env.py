@@ -4,10 +4,19 @@
 This module provides functions that can be used to interact with the dockerised cluster from the local host.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import functools
+import io
 import logging
+import re
 import subprocess
+import tarfile
+import time
+import traceback
+
+from typing import Any, Iterable, Iterator, List, Optional
 
 import docker
 
@@ -25,6 +34,7 @@ class DockerSubprocessException(Exception):
         Args:
             message: A user-defined message - it can be used to describe the concrete situation.
             process_result: The `subprocess.CompletedProcess` object returned by the process running function.
+                Its `stdout` or `stderr` may be `None` if the stream was not captured.
 
         """
 
@@ -33,72 +43,127 @@ class DockerSubprocessException(Exception):
         self.stdout = process_result.stdout
         self.stderr = process_result.stderr
 
-        exception_message = "{}\nReturn code:\n{}\nStdout:\n{}\nStderr:\n{}".format(self.message,
-                                                                                    self.returncode,
-                                                                                    self.stdout,
-                                                                                    self.stderr)
+        # The output streams that were not captured are left out of the message.
+        exception_message = "{}\nReturn code:\n{}".format(self.message, self.returncode)
+        if self.stdout is not None:
+            exception_message += "\nStdout:\n{}".format(self.stdout)
+        if self.stderr is not None:
+            exception_message += "\nStderr:\n{}".format(self.stderr)
         super().__init__(exception_message)
 
-def _get_first_container_of_service(service_name: str) -> docker.models.containers.Container:
-    docker_client = docker.from_env()
+# Creating a client reads the environment and negotiates the API version with the daemon, so one client is shared by
+# all functions of this module. The client's connection pool is safe to use from several threads.
+@functools.lru_cache(maxsize=1)
+def _docker_client() -> docker.DockerClient:
+    return docker.from_env()
 
-    filters = {"name" : ".*{}.*".format(service_name)}
-    return docker_client.containers.list(filters=filters)[0]
+def _get_first_container_of_service(service_name: str, project_name: str) -> docker.models.containers.Container:
+    # The containers are filtered by their docker-compose labels on the server side, which is unambiguous
+    # even if several clusters are running at the same time.
+    filters = {"label" : ["com.docker.compose.project={}".format(project_name),
+                          "com.docker.compose.service={}".format(service_name)]}
+    return _docker_client().containers.list(filters=filters)[0]
 
-def get_oozieserver() -> docker.models.containers.Container:
+def get_oozieserver(project_name: str) -> docker.models.containers.Container:
     """
     Returns the Oozie server in the dockerised cluster. If there are multiple Oozie servers, returns one of them.
 
+    Args:
+        project_name: The docker-compose project of the cluster.
+
     Returns:
         The Oozie server in the dockerised cluster.
 
     """
 
-    return _get_first_container_of_service("oozieserver")
+    return _get_first_container_of_service("oozieserver", project_name)
 
-def get_nodemanager() -> docker.models.containers.Container:
+def get_nodemanager(project_name: str) -> docker.models.containers.Container:
     """
     Returns the node manager in the dockerised cluster. If there are multiple node managers, returns one of them.
 
+    Args:
+        project_name: The docker-compose project of the cluster.
+
     Returns:
         The node manager in the dockerised cluster, or one of them if there are several.
 
     """
 
-    return _get_first_container_of_service("nodemanager")
+    return _get_first_container_of_service("nodemanager", project_name)
+
+def compose_project_name(name: str) -> str:
+    """
+    Converts a name to a docker-compose project name the same way docker-compose normalises project names, so that the
+    result can also be used to find the containers of the project by their labels.
+
+    Args:
+        name: The name to convert, for example the name of a docker-compose directory.
+
+    Returns:
+        The docker-compose project name.
+
+    """
 
-def docker_compose_up(directory: Path) -> None:
+    return re.sub(r"[^-_a-z0-9]", "", name.lower())
+
+@functools.lru_cache(maxsize=1)
+def _docker_compose_executable() -> List[str]:
+    # The `docker compose` plugin starts much faster than the standalone `docker-compose` script, so it is used if it
+    # is installed. This is only checked once per process.
+    try:
+        process_result = subprocess.run(["docker", "compose", "version"],
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if process_result.returncode == 0:
+            return ["docker", "compose"]
+    except OSError:
+        pass
+
+    return ["docker-compose"]
+
+def _docker_compose_command(project_name: Optional[str], *args: str) -> List[str]:
+    command = list(_docker_compose_executable())
+    if project_name is not None:
+        command.extend(("--project-name", project_name))
+    command.extend(args)
+    return command
+
+def docker_compose_up(directory: Path, project_name: Optional[str] = None) -> None:
     """
     Starts a docker-compose cluster.
 
     Args:
         directory: The docker-compose directory in which the docker-compose.yaml file
             and any additional resources are located.
+        project_name: The docker-compose project name of the cluster. If not provided,
+            docker-compose derives it from the directory name.
 
     """
 
     logging.info("Starting the dockerised cluster.")
-    command_up = ["docker-compose", "up", "-d"]
-    process_result = subprocess.run(command_up, cwd=directory.expanduser().resolve(),
-                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    command_up = _docker_compose_command(project_name, "up", "-d")
+    process_result = subprocess.run(command_up, cwd=str(directory),
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
 
     if process_result.returncode != 0:
         raise DockerSubprocessException("Error: `docker-compose up` failed.", process_result)
 
-def docker_compose_down(directory: Path) -> None:
+def docker_compose_down(directory: Path, project_name: Optional[str] = None) -> None:
     """
     Brings down a docker-compose cluster.
 
     Args:
         directory:The docker-compose directory in which the docker-compose.yaml file
             and any additional resources are located.
+        project_name: The docker-compose project name of the cluster. If not provided,
+            docker-compose derives it from the directory name.
 
     """
 
     logging.info("Stopping the dockerised cluster.")
-    command_down = ["docker-compose", "down"]
-    process_result = subprocess.run(command_down, cwd=directory.expanduser().resolve(),
-                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    command_down = _docker_compose_command(project_name, "down")
+    process_result = subprocess.run(command_down, cwd=str(directory),
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
 
     if process_result.returncode != 0:
         raise DockerSubprocessException("Error: `docker-compose down` failed.", process_result)
@@ -113,10 +178,54 @@ def docker_remove_image(image_name: str) -> None:
     """
 
     logging.info("Removing docker image %s.", image_name)
-    docker_client = docker.from_env()
+    docker_client = _docker_client()
 
     docker_client.images.remove(image_name)
 
+def docker_remove_images(image_names: Iterable[str], docker_client: Optional[docker.DockerClient] = None) -> None:
+    """
+    Removes the docker images with the given names, in the given order, using a single docker client.
+    If an image cannot be removed, a warning is logged and the remaining images are still removed.
+
+    Args:
+        image_names: The names (tags) of the docker images to remove.
+        docker_client: The docker client to use. If not provided, the client shared by this module is used.
+
+    """
+
+    if docker_client is None:
+        docker_client = _docker_client()
+
+    for image_name in image_names:
+        logging.info("Removing docker image %s.", image_name)
+        try:
+            docker_client.images.remove(image_name)
+        # pylint: disable=broad-except
+        # We want to catch all exceptions to continue the cleanup.
+        except Exception:
+        # pylint: enable=broad-except
+            error_msg = traceback.format_exc()
+            logging.warning("Couldn't delete image, continuing with the next one (if any):\n%s.", error_msg)
+
+def docker_remove_image_groups(image_groups: Iterable[List[str]], max_workers: int = 8) -> None:
+    """
+    Removes groups of docker images. The images within a group are removed in the given order, as an image may
+    depend on the ones before it, but the groups are removed concurrently using a single docker client.
+    If an image cannot be removed, a warning is logged and the remaining images are still removed.
+
+    Args:
+        image_groups: The groups of the names (tags) of the docker images to remove.
+        max_workers: The maximal number of groups that are removed at the same time.
+
+    """
+
+    docker_client = _docker_client()
+
+    # Removing the images is done by the daemon, so the client threads mostly wait and the removals can overlap.
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for image_group in image_groups:
+            executor.submit(docker_remove_images, image_group, docker_client)
+
 def docker_cp_to_container(container_name: str, source: str, dest: str) -> None:
     """
     Copies a file or directory from the local file system to a running docker container.
@@ -129,11 +238,64 @@ def docker_cp_to_container(container_name: str, source: str, dest: str) -> None:
     """
 
     command = ["docker", "cp", source, "{}:{}".format(container_name, dest)]
-    process_result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    process_result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
 
     if process_result.returncode != 0:
         raise DockerSubprocessException("Error: docker copy to container failed.", process_result)
 
+def docker_put_archive_to_container(container: docker.models.containers.Container, source: Path, dest: str) -> None:
+    """
+    Copies a file or directory from the local file system to a running docker container, like
+    `docker_cp_to_container`, but sends it as an in-memory tar archive through the docker API instead
+    of running the `docker cp` command. The destination must be an existing directory.
+
+    Args:
+        container: The docker container to copy to.
+        source: The path on the local file system of the source file or directory that should be copied.
+        dest: The path of the directory on the container's file system into which the source should be copied.
+
+    """
+
+    container.put_archive(dest, create_tar_archive(source))
+
+def create_tar_archive(source: Path) -> bytes:
+    """
+    Creates an in-memory tar archive of a file or directory, with the file or directory as its only top level entry.
+
+    Args:
+        source: The path on the local file system of the file or directory that should be archived.
+
+    Returns:
+        The contents of the tar archive.
+
+    """
+
+    resolved_source = source.expanduser().resolve()
+
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w") as tar:
+        tar.add(str(resolved_source), arcname=resolved_source.name)
+
+    return archive.getvalue()
+
+@functools.lru_cache(maxsize=None)
+def inside_container_archive(inside_container: Path) -> bytes:
+    """
+    Returns the tar archive of the script files that are copied to the Oozie server containers. The files do not
+    change while the clusters are tested, so the archive is only created once and the same bytes are sent to the
+    Oozie server of every cluster.
+
+    Args:
+        inside_container: The path on the local file system where the files
+            that should be copied to the Oozie server container are located.
+
+    Returns:
+        The contents of the tar archive.
+
+    """
+
+    return create_tar_archive(inside_container)
+
 def docker_cp_from_container(container_name: str, source: str, dest: str) -> None:
     """
     Copies a file or directory from a running docker container to the local file system.
@@ -146,11 +308,159 @@ def docker_cp_from_container(container_name: str, source: str, dest: str) -> Non
     """
 
     command = ["docker", "cp", "{}:{}".format(container_name, source), dest]
-    process_result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    process_result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
 
     if process_result.returncode != 0:
         raise DockerSubprocessException("Error: docker copy from container failed.", process_result)
 
+def docker_get_archive_from_container(container: docker.models.containers.Container, source: str, dest: Path) -> None:
+    """
+    Copies a file or directory from a running docker container to the local file system, like
+    `docker_cp_from_container`, but receives it as a tar archive through the docker API instead of running
+    the `docker cp` command. As with `docker cp`, if `dest` is an existing directory, the source is copied into
+    it, otherwise it is copied to `dest`.
+
+    Args:
+        container: The docker container to copy from.
+        source: The path on the file system of the container of the source file or directory that should be copied.
+        dest: The path on the local file system to which the source should be copied.
+
+    """
+
+    (chunks, stat) = container.get_archive(source)
+
+    if dest.is_dir():
+        (target_dir, top_level_name) = (dest, stat["name"])
+    else:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        (target_dir, top_level_name) = (dest.parent, dest.name)
+
+    # The archive is read as a stream, so only one chunk of it is kept in memory at a time, however large the logs are.
+    with tarfile.open(fileobj=_ChunkReader(chunks), mode="r|") as tar:
+        _extract_with_top_level_name(tar, target_dir, top_level_name)
+
+class _ChunkReader(io.RawIOBase):
+    """
+    A read-only, non-seekable file object reading from an iterator of byte chunks.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        super().__init__()
+        self._chunks: Iterator[bytes] = iter(chunks)
+        self._current = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while not self._current:
+            try:
+                self._current = next(self._chunks)
+            except StopIteration:
+                return 0
+
+        size = min(len(buffer), len(self._current))
+        buffer[:size] = self._current[:size]
+        self._current = self._current[size:]
+        return size
+
+    def drain(self) -> None:
+        """
+        Reads the remaining chunks and drops them. Stream mode `tarfile`s stop reading at the end of the archive,
+        which may come before the end of the underlying stream.
+        """
+
+        for _ in self._chunks:
+            pass
+        self._current = b""
+
+    def close(self) -> None:
+        # The chunks may come from a generator that holds a connection to the docker daemon.
+        close_chunks = getattr(self._chunks, "close", None)
+        if close_chunks is not None:
+            close_chunks()
+        super().close()
+
+def _extract_with_top_level_name(tar: tarfile.TarFile, target_dir: Path, top_level_name: str) -> None:
+    # The archives of the docker API contain a single top level entry named after the source, which is renamed to
+    # the destination name. The members are extracted one by one as they are read.
+    for member in tar:
+        parts = _checked_member_path(member)
+
+        member.name = "/".join([top_level_name] + parts[1:])
+        if member.islnk():
+            member.linkname = "/".join([top_level_name] + member.linkname.split("/")[1:])
+
+        tar.extract(member, str(target_dir))
+
+def _checked_member_path(member: tarfile.TarInfo) -> List[str]:
+    parts = member.name.split("/")
+    if ".." in parts or member.name.startswith("/"):
+        raise ValueError("Unexpected path in the archive received from docker: {}.".format(member.name))
+
+    return parts
+
+def docker_exec_tar_from_container(container: docker.models.containers.Container,
+                                   directory: str,
+                                   names: List[str],
+                                   dest: Path) -> None:
+    """
+    Copies several files or directories from the same directory of a running docker container into a local
+    directory with a single `docker exec`, which runs `tar` in the container and streams its output. This
+    needs one round trip to the docker daemon instead of one `get_archive` call per file.
+
+    Args:
+        container: The docker container to copy from.
+        directory: The directory on the file system of the container in which the files are located.
+        names: The paths of the files or directories to copy, relative to `directory`.
+        dest: The directory on the local file system into which the files will be copied.
+
+    Raises:
+        DockerSubprocessException: If `tar` failed in the container, for example because a file did not exist.
+
+    """
+
+    cmd = ["tar", "-C", directory, "-cf", "-", "--"] + names
+
+    # Only the standard output is attached, so the stream contains nothing but the archive.
+    api = container.client.api
+    exec_id = api.exec_create(container.id, cmd, stdout=True, stderr=False)["Id"]
+    with _ChunkReader(api.exec_start(exec_id, stream=True)) as reader:
+        try:
+            with tarfile.open(fileobj=reader, mode="r|") as tar:
+                for member in tar:
+                    _checked_member_path(member)
+                    tar.extract(member, str(dest))
+        except tarfile.ReadError:
+            # If none of the files exist, `tar` writes no archive at all. The exit code tells why.
+            reader.drain()
+            _check_exec_exit_code(api, exec_id, cmd)
+            raise
+
+        # The exec only finishes once its whole output has been read.
+        reader.drain()
+
+    _check_exec_exit_code(api, exec_id, cmd)
+
+# The interval at which a finished exec is polled until docker reports its exit code, in seconds.
+EXEC_POLL_TIME: float = 0.05
+
+def _check_exec_exit_code(api: docker.APIClient, exec_id: str, cmd: List[str]) -> None:
+    # The exit code is only set once docker has noticed that the process exited, which can take a moment even after
+    # its output has ended.
+    exec_info = api.exec_inspect(exec_id)
+    while exec_info["Running"]:
+        time.sleep(EXEC_POLL_TIME)
+        exec_info = api.exec_inspect(exec_id)
+
+    exit_code = exec_info["ExitCode"]
+    if exit_code != 0:
+        raise DockerSubprocessException("Error: `{}` failed in the container.".format(cmd[0]),
+                                        subprocess.CompletedProcess(cmd, exit_code, None, None))
+
+def _get_container(container_name: str) -> docker.models.containers.Container:
+    return _docker_client().containers.get(container_name)
+
 def copy_test_script_files_to_container(oozieserver_name: str, inside_container: Path) -> None:
     """
     Copies the script files that will be run within the container to test Oozie.
@@ -162,10 +472,12 @@ def copy_test_script_files_to_container(oozieserver_name: str, inside_container:
 
     """
 
+    _put_test_script_files(_get_container(oozieserver_name), inside_container)
 
-
+def _put_test_script_files(oozieserver: docker.models.containers.Container, inside_container: Path) -> None:
+    # The files are sent through the docker API instead of `docker cp`.
     logging.info("Copying files to the container.")
-    docker_cp_to_container(oozieserver_name, str(inside_container), "/opt/oozie/")
+    oozieserver.put_archive("/opt/oozie/", inside_container_archive(inside_container))
 
 def upload_examples_to_hdfs(oozieserver: docker.models.containers.Container) -> None:
     """
@@ -177,7 +489,8 @@ def upload_examples_to_hdfs(oozieserver: docker.models.containers.Container) ->
     """
 
     logging.info("Uploading the tests to hdfs.")
-    (errcode, _) = oozieserver.exec_run("/bin/bash /opt/oozie/inside_container/prepare_examples.sh",
+    # The command is passed as an argument list, like the command of the example runner, so it needs no splitting.
+    (errcode, _) = oozieserver.exec_run(["/bin/bash", "/opt/oozie/inside_container/prepare_examples.sh"],
                                         workdir="/opt/oozie")
     logging.info("Uploading the tests finished with exit code: %s.", errcode)
 
@@ -192,7 +505,7 @@ def setup_testing_env_in_container(oozieserver: docker.models.containers.Contain
             that should be copied to the Oozie server container are located.
     """
 
-    copy_test_script_files_to_container(oozieserver.name, inside_container)
+    _put_test_script_files(oozieserver, inside_container)
     upload_examples_to_hdfs(oozieserver)
 
 def copy_oozie_logs(oozieserver_name: str, output: Path) -> None:
@@ -207,7 +520,7 @@ def copy_oozie_logs(oozieserver_name: str, output: Path) -> None:
 
     logging.info("Copying the Oozie logs to %s.", output)
 
-    docker_cp_from_container(oozieserver_name, "/opt/oozie/logs", str(output))
+    docker_get_archive_from_container(_get_container(oozieserver_name), "/opt/oozie/logs", output)
 
 def copy_yarn_logs(nodemanager_name: str, output: Path) -> None:
     """
@@ -223,8 +536,16 @@ def copy_yarn_logs(nodemanager_name: str, output: Path) -> None:
 
     output.mkdir(parents=True, exist_ok=True)
 
-    docker_cp_from_container(nodemanager_name, "/tmp/hadoop-hadoop/nm-local-dir", str(output / "nm-local-dir"))
-    docker_cp_from_container(nodemanager_name, "/opt/hadoop/logs/userlogs", str(output / "hadoop-logs"))
+    nodemanager = _get_container(nodemanager_name)
+
+    # The two directories are independent, so they are received over two concurrent archive streams.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        copies = [executor.submit(docker_get_archive_from_container,
+                                  nodemanager, "/tmp/hadoop-hadoop/nm-local-dir", output / "nm-local-dir"),
+                  executor.submit(docker_get_archive_from_container,
+                                  nodemanager, "/opt/hadoop/logs/userlogs", output / "hadoop-logs")]
+        for copy in copies:
+            copy.result()
 
 def copy_logfile_and_report_records(oozieserver_name: str, logfile: str, report_file: str, output: Path) -> None:
     """
@@ -245,8 +566,7 @@ def copy_logfile_and_report_records(oozieserver_name: str, logfile: str, report_
 
     output.mkdir(parents=True, exist_ok=True)
 
-    docker_cp_from_container(oozieserver_name, "/opt/oozie/{}".format(logfile), str(output))
-    docker_cp_from_container(oozieserver_name, "/opt/oozie/{}".format(report_file), str(output))
+    docker_exec_tar_from_container(_get_container(oozieserver_name), "/opt/oozie", [logfile, report_file], output)
 
 def copy_nodemanager_logs(nodemanager_name: str, output: Path) -> None:
     logging.info("Copying the nodemanager logs.")
@@ -256,5 +576,6 @@ def copy_nodemanager_logs(nodemanager_name: str, output: Path) -> None:
     if process_result.returncode != 0:
         raise DockerSubprocessException("Error: `docker logs` failed.", process_result)
 
-    with (output.expanduser().resolve() / "nodemanager.log").open("w") as logfile:
+    output.mkdir(parents=True, exist_ok=True)
+    with (output / "nodemanager.log").open("w") as logfile:
         logfile.write(process_result.stdout.decode())
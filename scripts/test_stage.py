@@ -6,14 +6,18 @@ This file contains the entry point of the script that performs the Oozie testing
 
 import argparse
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import functools
+import hashlib
+import json
 import logging
-import pickle
+import os
 import sys
 import traceback
 
-from typing import Any, List
+from typing import List
 
 import dbd_build
 import output
@@ -27,6 +31,9 @@ import oozie_testing.inside_container.report as report
 
 import test_env
 
+# The directory of the scripts that are copied into the Oozie server container, resolved once for all clusters.
+INSIDE_CONTAINER_DIR: Path = Path(oozie_testing.inside_container.__file__).parent.resolve()
+
 def write_to_file(text: str, path: Path) -> None:
     """
     Writes a string to a file, making sure that the parents of the file path exist, creating them if needed.
@@ -37,9 +44,8 @@ def write_to_file(text: str, path: Path) -> None:
 
     """
 
-    resolved = path.expanduser().resolve()
-    resolved.parent.mkdir(parents=True, exist_ok=True)
-    with resolved.open("w") as file:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as file:
         file.write(text)
 
 def get_argument_parser() -> argparse.ArgumentParser:
@@ -67,24 +73,19 @@ def get_argument_parser() -> argparse.ArgumentParser:
     parser.add_argument("-v", "--validate", nargs="*",
                         help="A list of fluent examples that should only be validated, not run.")
     parser.add_argument("-t", "--timeout", type=int, help="The timeout after which running examples are killed.")
+    parser.add_argument("-p", "--parallelism", type=int, default=1,
+                        help="The maximal number of examples that are run at the same time within a cluster.")
+    parser.add_argument("-P", "--cluster_parallelism", type=int, default=1,
+                        help="The maximal number of dockerised clusters that are tested at the same time. The "
+                        + "clusters must not publish the same host ports if more than one is run at a time.")
+    parser.add_argument("-j", "--build_parallelism", type=int, default=1,
+                        help="The maximal number of BuildConfigurations that are built with dbd at the same time. "
+                        + "The dbd processes share the cache.")
     parser.add_argument("-s", "--cache_size", required=True,
                         help="the maximal number of (regular) files that are allowed to be in the cache")
 
     return parser
 
-class ReportUnpickler(pickle.Unpickler):
-    """
-    A custom `pickle.Unpickler` that is needed because the object we would like to unpickle is generated
-    inside a docker container where the import path of the class of the object is different than here.
-
-    """
-
-    def find_class(self, module: str, name: str) -> Any:
-        if module == "report":
-            return report.__dict__[name]
-
-        return super().find_class(module, name)
-
 def copy_logs(oozieserver_name: str,
               nodemanager_name: str,
               current_report_dir: Path,
@@ -104,10 +105,17 @@ def copy_logs(oozieserver_name: str,
 
     """
 
-    test_env.copy_logfile_and_report_records(oozieserver_name, logfile, report_records_file, current_report_dir)
-    test_env.copy_oozie_logs(oozieserver_name, current_report_dir / "oozieserver")
-    test_env.copy_yarn_logs(nodemanager_name, current_report_dir / "nodemanager")
-    test_env.copy_nodemanager_logs(nodemanager_name, current_report_dir / "nodemanager")
+    # The copies do not depend on each other, so they are run concurrently. The first error (if any) is raised
+    # once all of them have finished.
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        copies = [executor.submit(test_env.copy_logfile_and_report_records,
+                                  oozieserver_name, logfile, report_records_file, current_report_dir),
+                  executor.submit(test_env.copy_oozie_logs, oozieserver_name, current_report_dir / "oozieserver"),
+                  executor.submit(test_env.copy_yarn_logs, nodemanager_name, current_report_dir / "nodemanager"),
+                  executor.submit(test_env.copy_nodemanager_logs, nodemanager_name, current_report_dir / "nodemanager")]
+
+    for copy in copies:
+        copy.result()
 
 def write_report(build_config_name: str,
                  current_report_dir: Path,
@@ -118,24 +126,27 @@ def write_report(build_config_name: str,
     Args:
         current_report_dir: The directory in which the report file will be written.
         report_records_file: The name of the file containing the results of the test.
-            This file will be pickled to retrieve the corresponding object.
+            This file contains the JSON representations of the `ReportRecord` objects, one per line.
     """
 
-    report_records: List[report.ReportRecord]
     local_report_records_file = current_report_dir / report_records_file
-    with (local_report_records_file).open("rb") as file:
-        report_records = ReportUnpickler(file).load()
-
-        local_report_records_file.unlink()
+    with local_report_records_file.open(encoding="utf-8") as file:
+        # The records are counted first, as the count is written before them, and then read one at a time while the
+        # report is written, so they are never all kept in memory.
+        number_of_records = sum(1 for line in file if line.strip())
+        file.seek(0)
+        report_records = (report.ReportRecord.from_dict(json.loads(line)) for line in file if line.strip())
 
-        xml_report = output.generate_report(build_config_name, report_records, current_report_dir)
         xml_report_file = current_report_dir / "report_examples.xml"
-        xml_report.write(str(xml_report_file))
+        output.write_report(build_config_name, report_records, current_report_dir, xml_report_file, number_of_records)
+
+    local_report_records_file.unlink()
 
 def perform_testing(args: argparse.Namespace,
                     reports_dir: Path,
                     build_config_name: str,
-                    timeout: int) -> int:
+                    timeout: int,
+                    project_name: str) -> int:
     """
     In a running dockerised cluster, performs the initialisation of the environment,
     runs the tests, collects the logs and generates the test report.
@@ -147,6 +158,7 @@ def perform_testing(args: argparse.Namespace,
             subdirectories with the name of the `BuildConfiguration`.
         build_config_name: The name of the current `BuildConfiguration`.
         timeout: The timeout after which running examples are killed.
+        project_name: The docker-compose project of the running cluster.
 
     Returns:
         The exit code of the process running the example tests inside the Oozie docker container.
@@ -154,12 +166,11 @@ def perform_testing(args: argparse.Namespace,
 
     """
 
-    oozieserver = test_env.get_oozieserver()
-    inside_container = Path(oozie_testing.inside_container.__file__).parent.expanduser().resolve()
-    test_env.setup_testing_env_in_container(oozieserver, inside_container)
+    oozieserver = test_env.get_oozieserver(project_name)
+    test_env.setup_testing_env_in_container(oozieserver, INSIDE_CONTAINER_DIR)
 
     examples_logfile = "example_runner.log"
-    examples_report_records_file = "report_records.pickle"
+    examples_report_records_file = "report_records.jsonl"
 
     exit_code_examples = oozie_testing.examples.run_oozie_examples_with_dbd(oozieserver,
                                                                             examples_logfile,
@@ -167,11 +178,12 @@ def perform_testing(args: argparse.Namespace,
                                                                             args.whitelist,
                                                                             args.blacklist,
                                                                             args.validate,
-                                                                            timeout)
+                                                                            timeout,
+                                                                            args.parallelism)
 
     current_report_dir = reports_dir / build_config_name
 
-    nodemanager = test_env.get_nodemanager()
+    nodemanager = test_env.get_nodemanager(project_name)
 
     copy_logs(oozieserver.name, nodemanager.name, current_report_dir, examples_logfile, examples_report_records_file)
 
@@ -204,9 +216,13 @@ def start_cluster_and_perform_testing(args: argparse.Namespace,
 
     exit_code: int
 
+    # The clusters of different `BuildConfiguration`s may run at the same time, so their
+    # containers are told apart by their docker-compose project.
+    project_name = test_env.compose_project_name(build_config_dir.name)
+
     try:
-        test_env.docker_compose_up(build_config_dir)
-        exit_code = perform_testing(args, reports_dir, build_config_dir.name, timeout)
+        test_env.docker_compose_up(build_config_dir, project_name)
+        exit_code = perform_testing(args, reports_dir, build_config_dir.name, timeout, project_name)
 
     # We catch all exceptions to be able to continue with other BuildConfigurations if there are any.
     # pylint: disable=broad-except
@@ -216,16 +232,18 @@ def start_cluster_and_perform_testing(args: argparse.Namespace,
 
         exit_code = 2
     finally:
-        test_env.docker_compose_down(build_config_dir)
+        test_env.docker_compose_down(build_config_dir, project_name)
 
     return exit_code
 
 def test_all_configurations(args: argparse.Namespace,
                             reports_dir: Path,
                             build_config_dirs: List[Path],
-                            timeout: int) -> List[int]:
+                            timeout: int,
+                            max_workers: int = 1) -> List[int]:
     """
-    Runs the tests in all the `BuildConfiguration`s.
+    Runs the tests in all the `BuildConfiguration`s. The `BuildConfiguration`s are tested concurrently, each in its
+    own dockerised cluster, if `max_workers` is greater than one.
 
     Args:
         args: The arguments parsed from the command line.
@@ -235,19 +253,19 @@ def test_all_configurations(args: argparse.Namespace,
         build_config_dirs: The directories where the `BuildConfiguration`s
             are built and where the docker-compose files are located.
         timeout: The timeout after which running examples are killed.
+        max_workers: The maximal number of `BuildConfiguration`s that are tested at the same time.
 
     Returns:
-        A list with the exit codes of the processes running the example tests.
+        A list with the exit codes of the processes running the example tests, in the order of `build_config_dirs`.
         The values are 1 if any tests failed and 2 if an exception occurred - 0 otherwise.
 
     """
 
-    res = []
-    for build_config_dir in build_config_dirs:
-        return_code = start_cluster_and_perform_testing(args, reports_dir, build_config_dir, timeout)
-        res.append(return_code)
-
-    return res
+    # Testing a `BuildConfiguration` mostly waits for the cluster, so the threads do not compete for the interpreter.
+    # `start_cluster_and_perform_testing` catches the exceptions itself.
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        test_configuration = functools.partial(start_cluster_and_perform_testing, args, reports_dir, timeout=timeout)
+        return list(executor.map(test_configuration, build_config_dirs))
 
 def main() -> None:
     """
@@ -256,19 +274,26 @@ def main() -> None:
 
     args = get_argument_parser().parse_args()
 
-    configurations_dir = Path(args.configurations_dir)
-    output_dir = Path(args.output_dir)
-    reports_dir = Path("testing/reports")
-    dbd_path = Path("testing/dbd/run_dbd.py")
-    cache_dir = Path("./dbd_cache")
+    # The paths are expanded and resolved only once here, the functions they are passed to use them as they are.
+    configurations_dir = Path(args.configurations_dir).expanduser().resolve()
+    output_dir = Path(args.output_dir).expanduser().resolve()
+    reports_dir = Path("testing/reports").resolve()
+    dbd_path = Path("testing/dbd/run_dbd.py").resolve()
+    cache_dir = Path("./dbd_cache").resolve()
     timeout = args.timeout if args.timeout is not None else 180
 
     dbd_build.build_configs_with_dbd(configurations_dir, args.configurations,
-                                     output_dir, dbd_path, cache_dir, args.cache_size)
+                                     output_dir, dbd_path, cache_dir, args.cache_size, args.build_parallelism)
+
+    with os.scandir(str(output_dir)) as entries:
+        build_config_dirs = [Path(entry.path) for entry in entries if entry.is_dir()]
 
-    build_config_dirs = list(output_dir.expanduser().resolve().iterdir())
+    # The archive of the container scripts is built before the clusters are tested, so that concurrently tested
+    # clusters do not each build it. The digest identifies the scripts that were tested in the logs.
+    scripts_archive = test_env.inside_container_archive(INSIDE_CONTAINER_DIR)
+    logging.info("Built the archive of the container scripts, sha1: %s.", hashlib.sha1(scripts_archive).hexdigest())
 
-    test_exit_codes = test_all_configurations(args, reports_dir, build_config_dirs, timeout)
+    test_exit_codes = test_all_configurations(args, reports_dir, build_config_dirs, timeout, args.cluster_parallelism)
 
     max_exit_code = max(test_exit_codes)
 